@@ -14,6 +14,8 @@ from src.components.histogramme import histogramme_layout
 from src.components.donut import donut_layout
 from src.components.infos_departement import infos_departement_layout
 from src.components.graphiquecourbe import graphiquecourbe_layout
+from src.utils.sqlite_utils import connect
+from src.utils.data_utils import ensure_indexes
 
 
 ROOT = Path(__file__).resolve().parent
@@ -80,6 +82,9 @@ except Exception as e:
     if DB_PATH.exists():
         _bind_db_env(DB_PATH)
 
+# Bases construites par une ancienne version de to_sqlite.py : ajout des index composites manquants
+# (avant toute connexion en lecture ; sans effet sur une base à jour)
+ensure_indexes(DB_PATH)
 
 
 CARD_STYLE = {
@@ -99,7 +104,7 @@ TITLE_STYLE = {
 
 def _get_total_accidents_2024(db_path: Path) -> int:
     """Compte le nombre total d'accidents (lignes) en 2024 dans la table caractéristiques."""
-    with sqlite3.connect(db_path) as conn:
+    with connect(db_path) as conn:
         tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table';")]
         cand = "caracteristiques" if "caracteristiques" in tables else None
         if cand is None:
@@ -1,8 +1,8 @@
 from __future__ import annotations
+import json
 import dash
 from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
-import pandas as pd
 from pathlib import Path
 from config import DB_PATH, DEPT_GEOJSON
 from ..utils.data_utils import load_accidents, load_geojson_departments
@@ -20,6 +20,34 @@ FR_CENTER = {"lat": 46.4, "lon": 2.0}
 MAP_INIT_ZOOM = 4.3
 
 
+# Callback côté navigateur pour le filtre d'intensité : repart de la figure de base et grise
+# les traces (une par classe, code de classe en customdata[5]) des classes non sélectionnées.
+# Paramètres injectés : liste des codes autorisés, couleur des départements non sélectionnés.
+_FILTER_JS = """
+function(n_apply, n_reset, selected, baseFig) {
+    const allowed = %s;
+    const dim = %s;
+    if (!baseFig) {
+        return [window.dash_clientside.no_update, selected];
+    }
+    const ctx = window.dash_clientside.callback_context;
+    const trig = ctx.triggered.length ? ctx.triggered[0].prop_id : "";
+    if (trig.startsWith("reset-filter")) {
+        selected = allowed.slice();
+    }
+    const keep = new Set(selected || []);
+    const fig = JSON.parse(JSON.stringify(baseFig));
+    fig.data.forEach(function (trace) {
+        const code = (trace.customdata && trace.customdata.length) ? trace.customdata[0][5] : null;
+        if (!keep.has(code)) {
+            trace.colorscale = [[0, dim], [1, dim]];
+        }
+    });
+    return [fig, selected];
+}
+"""
+
+
 # Fonction pour formater les nombres avec des espaces comme séparateurs de milliers
 def _fmt(n):
     try:
@@ -28,6 +56,25 @@ def _fmt(n):
         return str(n)
 
 
+# Cache des données de la carte : chargées et classées une seule fois par processus
+_CACHE: dict = {}
+
+
+# Fonction pour charger (une seule fois) les données de la carte et formater les seuils de la légende
+def _map_data() -> dict:
+    if not _CACHE:
+        df = load_accidents(Path(DB_PATH), year=2024)
+        geojson = load_geojson_departments(Path(DEPT_GEOJSON))
+        depc, bounds = prepare_dep_classes(df)
+        _CACHE.update(
+            depc=depc,
+            geojson=geojson,
+            bounds=bounds,
+            bound_labels=tuple(_fmt(b) for b in bounds),  # Seuils déjà formatés pour la légende
+        )
+    return _CACHE
+
+
 # Fonction pour créer une ligne de légende avec une couleur et une étiquette
 def _legend_row(color, label):
     return html.Div(
@@ -49,6 +96,22 @@ def _legend_row(color, label):
     )
 
 
+# Fonction pour construire (une seule fois) les lignes de la légende à partir des seuils en cache
+def _legend() -> list:
+    data = _map_data()
+    if "legend" not in data:
+        b1, b2, b3, b4 = data["bound_labels"]
+        data["legend"] = [
+            html.Div("   Echelle d’intensité", style={"textAlign": "center", "fontWeight": 600, "marginBottom": "8px"}),
+            _legend_row(BASE_COLOR_MAP["Très faible"], f"Très faible (≤ {b1} accidents)"),
+            _legend_row(BASE_COLOR_MAP["Faible"], f"Faible ({b1} – {b2} accidents)"),
+            _legend_row(BASE_COLOR_MAP["Moyen"], f"Moyen ({b2} – {b3} accidents)"),
+            _legend_row(BASE_COLOR_MAP["Élevé"], f"Élevé ({b3} – {b4} accidents)"),
+            _legend_row(BASE_COLOR_MAP["Très élevé"], f"Très élevé (> {b4} accidents)"),
+        ]
+    return data["legend"]
+
+
 # Fonction principale pour définir la mise en page de la carte avec légende et filtres
 def layout(app: dash.Dash):
     # Paramètres de la page et du style
@@ -64,10 +127,9 @@ def layout(app: dash.Dash):
         dangerously_allow_html=True,
     )
 
-    # Chargement des données (accidents et géoJSON des départements)
-    df = load_accidents(Path(DB_PATH), year=2024)
-    geojson = load_geojson_departments(Path(DEPT_GEOJSON))
-    depc, (b1, b2, b3, b4) = prepare_dep_classes(df)
+    # Chargement des données (accidents et géoJSON des départements), mises en cache
+    data = _map_data()
+    depc, geojson = data["depc"], data["geojson"]
     allowed_codes = [c for c in CLASS_CODE_ORDER if c != "ex"]
 
     # Création de la figure de base pour la carte
@@ -109,12 +171,7 @@ def layout(app: dash.Dash):
     # Création du panneau latéral avec la légende et les filtres
     side_panel = html.Div(
         [
-            html.Div("   Echelle d’intensité", style={"textAlign": "center", "fontWeight": 600, "marginBottom": "8px"}),
-            _legend_row(BASE_COLOR_MAP["Très faible"], f"Très faible (≤ {_fmt(b1)} accidents)"),
-            _legend_row(BASE_COLOR_MAP["Faible"], f"Faible ({_fmt(b1)} – {_fmt(b2)} accidents)"),
-            _legend_row(BASE_COLOR_MAP["Moyen"], f"Moyen ({_fmt(b2)} – {_fmt(b3)} accidents)"),
-            _legend_row(BASE_COLOR_MAP["Élevé"], f"Élevé ({_fmt(b3)} – {_fmt(b4)} accidents)"),
-            _legend_row(BASE_COLOR_MAP["Très élevé"], f"Très élevé (> {_fmt(b4)} accidents)"),
+            *_legend(),
 
             # Section pour filtrer par intensité
             html.Div("Filtrer par intensité", style={"textAlign": "center", "marginTop": "14px", "marginBottom": "8px", "fontWeight": 600}),
@@ -183,10 +240,8 @@ def layout(app: dash.Dash):
         },
     )
 
-    # Définition des "stores" pour stocker les données nécessaires au rendu dynamique
+    # Figure de base (toutes les classes visibles), relue par le callback côté navigateur
     stores = [
-        dcc.Store(id="store-depc", data=depc.to_dict("records")),
-        dcc.Store(id="store-geojson", data=geojson),
         dcc.Store(id="store-mapbase", data=base_fig.to_dict()),
     ]
 
@@ -195,49 +250,16 @@ def layout(app: dash.Dash):
                     style={"backgroundColor": "#ffffff", "minHeight": "100vh", "margin": "0", "padding": "0"})
 
 
-    # Callback pour mettre à jour la carte en fonction des filtres
-    @app.callback(
+    # Callback (exécuté dans le navigateur) pour mettre à jour la carte en fonction des filtres
+    app.clientside_callback(
+        _FILTER_JS % (json.dumps(allowed_codes), json.dumps(BASE_COLOR_MAP["_DIM_"])),
         Output("map-accidents", "figure"),
         Output("classe-filter", "value"),
-        Output("store-mapbase", "data"),
         Input("apply-filter", "n_clicks"),
         Input("reset-filter", "n_clicks"),
         State("classe-filter", "value"),
-        State("store-depc", "data"),
-        State("store-geojson", "data"),
         State("store-mapbase", "data"),
         prevent_initial_call=True,
     )
-    def update_map(n_apply, n_reset, selected, depc_data, geojson_data, base_fig_dict):
-        if not depc_data or not geojson_data:
-            return dash.no_update, selected, base_fig_dict
-
-        # Récupérer le contexte de l'événement déclencheur
-        ctx = dash.callback_context
-        trig = ctx.triggered[0]["prop_id"].split(".")[0] if ctx.triggered else ""
-        if trig == "reset-filter":
-            selected = [c for c in CLASS_CODE_ORDER if c != "ex"]
-
-        # Préparation de la nouvelle figure de la carte en fonction des filtres
-        depc_df = pd.DataFrame(depc_data)
-        new_fig = build_map_figure(depc_df, geojson_data, selected_codes=selected)
-        new_fig.update_layout(
-            margin=dict(l=0, r=0, t=0, b=0),
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            autosize=True,
-            height=720,
-            dragmode=False,
-            mapbox=dict(
-                zoom=MAP_INIT_ZOOM,
-                center=FR_CENTER,
-                style="white-bg",
-                bearing=0,
-                pitch=0,
-                uirevision="map-fixed-v1",
-            ),
-            transition={"duration": 0},
-        )
-        return new_fig, selected, new_fig.to_dict()
 
     return page
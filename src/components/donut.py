@@ -1,19 +1,20 @@
 from __future__ import annotations
-import sqlite3
+from functools import lru_cache
 from pathlib import Path
 
 import dash
 from dash import html, dcc, Input, Output
-import plotly.graph_objects as go
-import pandas as pd
+import numpy as np
 
 from config import DB_PATH
+from ..utils.sqlite_utils import has_table, connect
 
 # Définition des constantes utilisées dans le code
 YEAR = 2024  # L'année des données que nous analysons
 MAJORITY = 18  # L'âge de la majorité pour la classification
 GRAV_MAPPING = {1: "Indemne", 4: "Léger", 3: "Hospitalisé", 2: "Tué"}  # Mapping des codes de gravité
 ORDER = ["Indemne", "Léger", "Hospitalisé", "Tué"]  # Ordre d'affichage des catégories
+GRAV_INDEX = {code: ORDER.index(label) for code, label in GRAV_MAPPING.items()}  # Position de chaque code de gravité dans ORDER
 COLORS = {"Indemne": "#94A3B8", "Léger": "#34D399", "Hospitalisé": "#F59E0B", "Tué": "#EF4444"}  # Couleurs associées à chaque catégorie
 
 # Fonction pour normaliser les valeurs à 100% (pourcentage total)
@@ -29,11 +30,10 @@ def _normalize_to_100(values):
         r[idx] = round(r[idx] + diff, 1)
     return r
 
-# Fonction pour lire et compter les gravités des usagers dans la base de données
-def _read_counts(db: Path, profile: str) -> pd.DataFrame:
+# Fonction pour construire la requête détaillée (jointure usagers/caracteristiques) pour un profil
+def _detail_query(p: str) -> tuple[str, list]:
     # Définir les conditions de filtrage pour la requête SQL
     cond = ["c.an = ?"]; params = [YEAR]
-    p = (profile or "").lower()  # Filtrer par type d'usager (conducteur, passager, majeur, mineur)
     if p == "conducteur":  cond.append("u.catu = 1")
     if p == "passagers":   cond.append("u.catu = 2")
     if p == "majeur":      cond += ["u.an_nais IS NOT NULL", "u.an_nais <= ?"]; params.append(YEAR - MAJORITY)
@@ -48,52 +48,92 @@ def _read_counts(db: Path, profile: str) -> pd.DataFrame:
         GROUP BY u.grav
         ORDER BY u.grav
     """
-    # Exécution de la requête et lecture des résultats dans un DataFrame
-    with sqlite3.connect(db) as conn:
-        df = pd.read_sql_query(sql, conn, params=params)
-    
-    # Si le DataFrame est vide, retourner un DataFrame vide avec des colonnes définies
-    if df.empty: return pd.DataFrame({"label": [], "n": []})
-    
-    # Mapper les codes de gravité aux labels correspondants
-    df["label"] = pd.to_numeric(df["grav"], errors="coerce").map(GRAV_MAPPING)
-    # Regrouper les données par label et sommer les comptages
-    df = df.groupby("label", as_index=False)["n"].sum()
-    # Classer les labels selon l'ordre défini
-    df["label"] = pd.Categorical(df["label"], categories=ORDER, ordered=True)
-    # Trier les résultats par label
-    return df.sort_values("label").reset_index(drop=True)
+    return sql, params
+
+# Fonction pour construire la requête sur la table de synthèse accident_grav_by_year (créée par to_sqlite.py)
+def _summary_query(p: str) -> tuple[str, list]:
+    cond = ["an = ?"]; params = [YEAR]
+    if p == "conducteur":  cond.append("catu = 1")
+    if p == "passagers":   cond.append("catu = 2")
+    if p == "majeur":      cond.append("majeur = 1")
+    if p == "mineur":      cond.append("majeur = 0")
+
+    sql = f"""
+        SELECT grav, SUM(n) AS n
+        FROM accident_grav_by_year
+        WHERE {' AND '.join(cond)}
+        GROUP BY grav
+        ORDER BY grav
+    """
+    return sql, params
+
+# Fonction pour lire et compter les gravités des usagers dans la base de données
+def _read_counts(db: Path, profile: str) -> np.ndarray:
+    p = (profile or "").lower()  # Filtrer par type d'usager (conducteur, passager, majeur, mineur)
+
+    # Exécution de la requête : lignes (grav, n) lues directement, sans DataFrame intermédiaire
+    # (table de synthèse si elle existe, sinon jointure complète pour les bases plus anciennes)
+    with connect(db) as conn:
+        sql, params = _summary_query(p) if has_table(conn, "accident_grav_by_year") else _detail_query(p)
+        rows = conn.execute(sql, params).fetchall()
+
+    # Effectifs dans l'ordre d'affichage (ORDER) ; les codes de gravité inconnus sont ignorés
+    counts = np.zeros(len(ORDER), dtype=np.int64)
+    for grav, n in rows:
+        idx = GRAV_INDEX.get(grav)
+        if idx is not None:
+            counts[idx] += n
+    return counts
 
 # Fonction pour générer la figure du donut avec les données
-def _figure(df: pd.DataFrame) -> go.Figure:
+# (dict brut passé tel quel à dcc.Graph : pas de validation des graph_objects de Plotly)
+def _figure(counts: np.ndarray) -> dict:
+    margin = {"l": 40, "r": 40, "t": 20, "b": 40}
+    # Ne garder que les catégories présentes
+    present = counts > 0
     # Si les données sont vides, afficher un message "Aucune donnée" dans un donut vide
-    if df.empty:
-        fig = go.Figure(go.Pie(labels=["Aucune donnée"], values=[1], hole=0.6, textinfo="none"))
-        fig.update_layout(margin=dict(l=40, r=40, t=20, b=40))
-        return fig
+    if not present.any():
+        return {
+            "data": [{"type": "pie", "labels": ["Aucune donnée"], "values": [1], "hole": 0.6, "textinfo": "none"}],
+            "layout": {"margin": margin},
+        }
+    labels = [l for l, keep in zip(ORDER, present) if keep]
+    counts = counts[present]
     
     # Calcul des pourcentages en normalisant les données à 100%
-    total = int(df["n"].sum())
-    pct = _normalize_to_100((df["n"] / total * 100.0).tolist())
+    total = int(counts.sum())
+    pct = _normalize_to_100((counts / total * 100.0).tolist())
     # Définir les couleurs à utiliser pour chaque catégorie
-    colors = [COLORS[l] for l in df["label"]]
+    colors = [COLORS[l] for l in labels]
     
-    # Création du graphique en donut avec Plotly
-    pie = go.Pie(
-        labels=df["label"], values=pct, customdata=df["n"].astype(int),
-        hole=0.55, sort=False, marker=dict(colors=colors),
-        textinfo="label+value", texttemplate="%{label}<br>%{value:.1f}%",
-        hovertemplate="<b>%{label}</b><br>%{customdata:,} cas • %{value:.1f}%<extra></extra>",
-        showlegend=False,
-    )
-    fig = go.Figure(pie)
+    # Création du graphique en donut
+    pie = {
+        "type": "pie",
+        "labels": labels, "values": pct, "customdata": counts.tolist(),
+        "hole": 0.55, "sort": False, "marker": {"colors": colors},
+        "textinfo": "label+value", "texttemplate": "%{label}<br>%{value:.1f}%",
+        "hovertemplate": "<b>%{label}</b><br>%{customdata:,} cas • %{value:.1f}%<extra></extra>",
+        "showlegend": False,
+    }
     
-    # Ajouter une annotation au centre du donut pour afficher le total des victimes
-    fig.add_annotation(x=0.5, y=0.5,
-                       text=f"<b>{total:,}</b><br><span style='font-size:12px;color:#6b7280'>victimes</span>",
-                       showarrow=False, align="center")
-    fig.update_layout(margin=dict(l=40, r=40, t=20, b=40), paper_bgcolor="#fff", plot_bgcolor="#fff")
-    return fig
+    # Annotation au centre du donut pour afficher le total des victimes
+    center = {"x": 0.5, "y": 0.5,
+              "text": f"<b>{total:,}</b><br><span style='font-size:12px;color:#6b7280'>victimes</span>",
+              "showarrow": False, "align": "center"}
+    return {
+        "data": [pie],
+        "layout": {"annotations": [center], "margin": margin, "paper_bgcolor": "#fff", "plot_bgcolor": "#fff",
+                   "dragmode": False},
+    }
+
+# Figure d'un profil mise en cache, invalidée si le fichier SQLite est modifié
+@lru_cache(maxsize=16)
+def _cached_figure_for(db_mtime: float, profile: str) -> dict:
+    return _figure(_read_counts(Path(DB_PATH), profile))
+
+# Fonction pour récupérer la figure d'un profil pour la version actuelle de la base
+def _cached_figure(profile: str) -> dict:
+    return _cached_figure_for(Path(DB_PATH).stat().st_mtime, (profile or "").lower())
 
 # Fonction qui définit le layout de la page avec le graphique et le dropdown de sélection
 def donut_layout(app: dash.Dash) -> html.Div:
@@ -112,18 +152,17 @@ def donut_layout(app: dash.Dash) -> html.Div:
         style={"maxWidth": "520px", "margin": "6px auto 12px auto"},
     )
     
-    # Création du graphique donut initial avec les données pour "conducteur"
+    # Création du graphique donut : la figure ("conducteur" par défaut) est fournie par le
+    # callback initial, les données ne sont donc chargées qu'au premier affichage de la page
     graph = dcc.Graph(id="donut-graph",
-                      figure=_figure(_read_counts(Path(DB_PATH), "conducteur")),
-
-                      config={"displayModeBar": False}, style={"height": "420px"})
+                      config={"displayModeBar": False, "scrollZoom": False, "doubleClick": False}, style={"height": "420px"})
     
     # Conteneur principal pour le dropdown et le graphique
     card = html.Div([dropdown, html.Div(graph, style={"maxWidth": "1100px", "margin": "0 auto"})],
                     style={"background": "white", "border": "1px solid #e5e7eb", "borderRadius": "12px", "padding": "10px"})
 
     # Callback pour mettre à jour le graphique en fonction de la sélection du dropdown
-    @app.callback(Output("donut-graph", "figure"), Input("donut-prof", "value"))
-    def _update(v): return _figure(_read_counts(Path(DB_PATH), v))
+    @app.callback(Output("donut-graph", "figure"), Input("donut-prof", "value"), prevent_initial_call=False)
+    def _update(v): return _cached_figure(v)
 
     return card
@@ -1,106 +1,117 @@
 from __future__ import annotations
 
-import sqlite3
+from functools import lru_cache
 from pathlib import Path
 
 import dash
 from dash import html, dcc
-import pandas as pd
-import plotly.graph_objects as go
+import numpy as np
 
 from config import DB_PATH
+from ..utils.sqlite_utils import has_table, connect
 
 # Liste des mois en français pour l'axe X des graphiques
 MONTHS_FR = ["janv.", "févr.", "mars", "avr.", "mai", "juin",
              "juil.", "août", "sept.", "oct.", "nov.", "déc."]
 
 # Fonction pour récupérer le nombre d'accidents par mois pour une année donnée
-def _fetch_mois(db_path: Path, year: int = 2024) -> pd.Series:
+def _fetch_counts(db_path: Path, year: int = 2024) -> np.ndarray:
     """
-    Lit la colonne 'mois' pour l'année demandée et retourne
-    une série d'effectifs indexée 1..12, représentant les mois de l'année.
+    Retourne un tableau de 12 effectifs (janvier..décembre) pour l'année demandée.
+    L'agrégation est faite par SQLite (GROUP BY mois) : au plus 12 lignes sont lues.
     """
-    sql = "SELECT mois FROM caracteristiques WHERE an = ?"
-    with sqlite3.connect(str(db_path)) as conn:
-        df = pd.read_sql_query(sql, conn, params=(year,))
-
-    # Convertir la colonne 'mois' en numérique et gérer les erreurs de conversion
-    df["mois"] = pd.to_numeric(df["mois"], errors="coerce")
-    # Filtrer les mois entre 1 et 12 inclus
-    df = df[df["mois"].between(1, 12)]
-    # Créer un index de 1 à 12 pour les mois
-    idx = pd.Index(range(1, 13), name="mois")
-    # Compter les occurrences de chaque mois, combler les mois manquants avec 0
-    s_total = df["mois"].value_counts().reindex(idx, fill_value=0).sort_index()
-    return s_total
+    with connect(db_path) as conn:
+        # Table de synthèse accident_by_month (créée par to_sqlite.py), sinon comptage sur caracteristiques
+        if has_table(conn, "accident_by_month"):
+            sql = """
+                SELECT CAST(mois AS INTEGER) AS m, SUM(n)
+                FROM accident_by_month
+                WHERE an = ? AND m BETWEEN 1 AND 12
+                GROUP BY m
+            """
+        else:
+            sql = """
+                SELECT CAST(mois AS INTEGER) AS m, COUNT(*)
+                FROM caracteristiques
+                WHERE an = ? AND m BETWEEN 1 AND 12
+                GROUP BY m
+            """
+        rows = conn.execute(sql, (year,)).fetchall()
+
+    # Placer chaque effectif à l'indice de son mois, les mois absents restent à 0
+    counts = np.zeros(12, dtype=np.int64)
+    if rows:
+        arr = np.asarray(rows, dtype=np.int64)
+        counts[arr[:, 0] - 1] = arr[:, 1]
+    return counts
 
 
 # Fonction pour créer un graphique en ligne avec les données d'accidents par mois
-def _build_line_total(s_total: pd.Series) -> go.Figure:
+# (dict brut passé tel quel à dcc.Graph : pas de validation des graph_objects de Plotly)
+def _build_line_total(counts: np.ndarray) -> dict:
     x = list(range(1, 13))  # Mois de 1 à 12 pour l'axe X
     grid_color = "#e5e7eb"  # Couleur de la grille
+    # Style commun aux deux axes
+    axis = {"showline": True, "linecolor": "#000", "linewidth": 1,
+            "showgrid": True, "gridcolor": grid_color, "gridwidth": 1}
+
+    # Courbe des accidents
+    line = {
+        "type": "scatter",
+        "x": x, "y": counts.tolist(),
+        "mode": "lines+markers",  # Mode ligne avec marqueurs
+        "name": "Accidents",  # Nom de la courbe
+        "line": {"width": 2, "color": "#f97316"},  # Style de la ligne
+        "marker": {"size": 6},  # Style des marqueurs
+    }
+
+    # Ligne verticale pour marquer le mois de juin (mois 6)
+    vline = {"type": "line", "xref": "x", "yref": "y domain", "x0": 6, "x1": 6, "y0": 0, "y1": 1,
+             "line": {"dash": "dot", "width": 1, "color": "#9ca3af"}}
+
+    layout = {
+        "shapes": [vline],
+        "margin": {"l": 30, "r": 20, "t": 10, "b": 40},
+        "legend": {"orientation": "h", "yanchor": "bottom", "y": 1.02, "xanchor": "right", "x": 1},
+        "paper_bgcolor": "white",
+        "plot_bgcolor": "white",
+        "hovermode": "x unified",
+        "dragmode": False,  # Pas de zoom/sélection à la souris : seul le survol reste actif
+        "transition": {"duration": 0},
+        # Axe X : mois en français
+        "xaxis": {"title": {"text": "Mois"}, "tickmode": "array", "tickvals": x, "ticktext": MONTHS_FR, **axis},
+        # Axe Y : commence à zéro, nombres avec séparateurs de milliers
+        "yaxis": {"title": {"text": "Nombre d'accidents"}, "tickformat": ",d",
+                  "rangemode": "tozero", "zeroline": False, **axis},
+    }
+    return {"data": [line], "layout": layout}
 
-    fig = go.Figure()
-    # Ajouter la courbe des accidents sur le graphique
-    fig.add_scatter(
-        x=x, y=s_total.values,
-        mode="lines+markers",  # Mode ligne avec marqueurs
-        name="Accidents",  # Nom de la courbe
-        line=dict(width=2, color="#f97316"),  # Style de la ligne
-        marker=dict(size=6)  # Style des marqueurs
-    )
 
-    # Ajouter une ligne verticale pour marquer le mois de juin (mois 6)
-    fig.add_vline(x=6, line_dash="dot", line_width=1, line_color="#9ca3af")
-
-    # Mise à jour du layout du graphique
-    fig.update_layout(
-        margin=dict(l=30, r=20, t=10, b=40),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-        paper_bgcolor="white",
-        plot_bgcolor="white",
-        hovermode="x unified",
-        transition={"duration": 0},
-    )
-    # Mise à jour de l'axe X
-    fig.update_xaxes(
-        title="Mois",
-        tickmode="array", tickvals=x, ticktext=MONTHS_FR,  # Mois en français
-        showline=True, linecolor="#000", linewidth=1,
-        showgrid=True, gridcolor=grid_color, gridwidth=1
-    )
-    # Mise à jour de l'axe Y
-    fig.update_yaxes(
-        title="Nombre d'accidents",
-        tickformat=",d",  # Format des nombres avec des virgules
-        showline=True, linecolor="#000", linewidth=1,
-        rangemode="tozero",  # L'axe commence à zéro
-        showgrid=True, gridcolor=grid_color, gridwidth=1, zeroline=False
-    )
-    return fig
+# Fonction pour créer un graphique vide lorsque les données sont indisponibles
+def _build_empty_figure() -> dict:
+    # Texte d'annotation pour signaler l'absence de données
+    note = {"text": "Données indisponibles (colonne 'mois')",
+            "x": 0.5, "y": 0.5, "xref": "paper", "yref": "paper", "showarrow": False}
+    return {
+        "data": [],
+        "layout": {"annotations": [note], "paper_bgcolor": "white", "plot_bgcolor": "white",
+                   "margin": {"l": 30, "r": 20, "t": 10, "b": 40}},
+    }
 
 
-# Fonction pour créer un graphique vide lorsque les données sont indisponibles
-def _build_empty_figure() -> go.Figure:
-    fig = go.Figure()
-    # Ajouter un texte d'annotation pour signaler l'absence de données
-    fig.add_annotation(
-        text="Données indisponibles (colonne 'mois')",
-        x=0.5, y=0.5, xref="paper", yref="paper", showarrow=False
-    )
-    fig.update_layout(paper_bgcolor="white", plot_bgcolor="white",
-                      margin=dict(l=30, r=20, t=10, b=40))
-    return fig
+# Figure des accidents mensuels mise en cache, invalidée si le fichier SQLite est modifié
+@lru_cache(maxsize=4)
+def _cached_figure(db_mtime: float, year: int) -> dict:
+    return _build_line_total(_fetch_counts(Path(DB_PATH), year=year))
 
 
 # Fonction pour définir le layout de la page avec le graphique de ligne des accidents mensuels
 def graphiquecourbe_layout(app: dash.Dash) -> html.Div:
     try:
-        # Récupérer les données d'accidents mensuels
-        s_total = _fetch_mois(Path(DB_PATH), year=2024)
-        fig = _build_line_total(s_total)  # Créer le graphique
+        # Récupérer la figure des accidents mensuels (calculée une fois par version de la base)
+        fig = _cached_figure(Path(DB_PATH).stat().st_mtime, 2024)
     except Exception:
-        # Si une erreur survient, afficher un graphique vide
+        # Si une erreur survient, afficher un graphique vide (non mis en cache)
         fig = _build_empty_figure()
 
     # Conteneur pour le graphique et le dropdown
@@ -1,11 +1,12 @@
 from __future__ import annotations
-import sqlite3
+from functools import lru_cache
 from pathlib import Path
 
-import pandas as pd
+import numpy as np
 import dash
 from dash import html, dcc, Input, Output
-import plotly.express as px
+
+from ..utils.sqlite_utils import connect
 
 try:
     from config import DB_PATH
@@ -15,85 +16,106 @@ except Exception:
 
 YEAR = 2024   # L'année des données utilisées pour l'analyse
 
-
-# Fonction pour charger les données d'âge des usagers et leurs catégories
-def load_age_base(year: int = YEAR) -> pd.DataFrame:
+# Tranches d'âge de 5 ans (axe X) : bornes 0, 5, ..., 100 et libellés "0-5", ..., "95-100"
+AGE_BIN_EDGES = np.arange(0, 105, 5, dtype=np.int32)
+AGE_BIN_LABELS = tuple(f"{AGE_BIN_EDGES[i]}-{AGE_BIN_EDGES[i + 1]}" for i in range(len(AGE_BIN_EDGES) - 1))
+
+# Expression SQL donnant l'indice de tranche d'un âge, générée à partir des bornes
+# (tranches fermées à droite, la première incluant 0 : comme pd.cut(..., include_lowest=True))
+AGE_BIN_SQL = "CASE " + " ".join(
+    f"WHEN age <= {int(edge)} THEN {i}" for i, edge in enumerate(AGE_BIN_EDGES[1:])
+) + " END"
+
+# Populations proposées dans le dropdown : (filtre SQL, libellé de l'axe Y, libellé du survol)
+POPULATIONS = {
+    "conducteurs": ("catu = 1", "Nombre d'accidents", "accidents"),
+    "decedes": ("grav = 2", "Nombre de décès", "victimes"),
+}
+
+# Requête SQL : une seule passe sur la jointure, un compteur par population et par tranche
+# (texte constant construit une fois : l'instruction préparée est réutilisée sur la connexion partagée)
+_POP_SUMS = ", ".join(f"SUM(CASE WHEN {cond} THEN 1 ELSE 0 END)" for cond, _, _ in POPULATIONS.values())
+_AGE_MATRIX_SQL = f"""
+    SELECT {AGE_BIN_SQL} AS tranche, {_POP_SUMS}
+    FROM (
+        SELECT ? - CAST(u.an_nais AS INTEGER) AS age, u.catu AS catu, u.grav AS grav
+        FROM usagers u
+        JOIN caracteristiques c ON c.num_acc = u.num_acc
+        WHERE c.an = ? AND u.an_nais IS NOT NULL
+    )
+    WHERE age BETWEEN ? AND ?
+    GROUP BY tranche
+"""
+
+# Options du dropdown de population
+POPULATION_OPTIONS = [
+    {"label": "Âge du conducteur", "value": "conducteurs"},
+    {"label": "Personnes décédées", "value": "decedes"},
+]
+
+# Fonction pour compter les usagers de chaque population par tranche d'âge, directement dans SQLite
+def _fetch_age_matrix(min_age: int = 14, year: int = YEAR) -> np.ndarray:
     """
     Lit directement SQLite :
       - usagers(num_acc, catu, grav, an_nais)
       - caracteristiques(an) pour filtrer sur l'année.
-    Retourne un DataFrame avec les colonnes: age, catu, grav.
+    Retourne une matrice (une ligne par population de POPULATIONS, dans l'ordre) des effectifs
+    des tranches d'âge AGE_BIN_LABELS (0-5, 5-10, ..., 95-100), pour les âges compris entre
+    min_age et la dernière borne. Le regroupement est fait par SQLite (AGE_BIN_SQL) : seules
+    une vingtaine de lignes remontent en Python.
     """
+    counts = np.zeros((len(POPULATIONS), len(AGE_BIN_LABELS)), dtype=np.int64)
     if not DB_FILE.exists():
-        return pd.DataFrame(columns=["age", "catu", "grav"])
-
-    # Requête SQL pour récupérer l'année de naissance, la catégorie (conducteur/passager), et la gravité
-    sql = """
-        SELECT u.an_nais, u.catu, u.grav
-        FROM usagers u
-        JOIN caracteristiques c ON c.num_acc = u.num_acc
-        WHERE c.an = ?
-    """
-    with sqlite3.connect(DB_FILE) as conn:
-        df = pd.read_sql_query(sql, conn, params=[year])
-
-    # Calcul de l'âge en fonction de l'année de naissance
-    an_nais = pd.to_numeric(df.get("an_nais"), errors="coerce")
-    age = year - an_nais
-
-    out = pd.DataFrame({
-        "age": age,
-        "catu": pd.to_numeric(df.get("catu"), errors="coerce"),
-        "grav": pd.to_numeric(df.get("grav"), errors="coerce"),
-    })
-
-    # Filtrer les âges valides entre 0 et 100
-    out = out[(out["age"] >= 0) & (out["age"] <= 100)]
-    return out.reset_index(drop=True)
+        return counts
 
+    with connect(DB_FILE) as conn:
+        rows = conn.execute(_AGE_MATRIX_SQL, (year, year, min_age, int(AGE_BIN_EDGES[-1]))).fetchall()
 
-# Fonction pour créer un histogramme des âges des usagers
-def make_age_histogram(df: pd.DataFrame, min_age: int = 0) -> pd.DataFrame:
-    """
-    Crée un histogramme des âges des usagers à partir des données filtrées
-    en fonction de l'âge minimum spécifié.
-    """
-    ages = pd.to_numeric(df.get("age", pd.Series(dtype="float64")), errors="coerce")
-    ages = ages[(ages >= min_age) & (ages <= 100)]  # Filtrer les âges valides
-
-    # Définir les intervalles d'âges
-    edges = list(range(0, 105, 5))
-    labels = [f"{edges[i]}-{edges[i+1]}" for i in range(len(edges) - 1)]
-    
-    # Créer les tranches d'âge et compter le nombre d'accidents dans chaque tranche
-    bins = pd.cut(ages, bins=edges, right=True, include_lowest=True, labels=labels)
-    counts = bins.value_counts(sort=False).reindex(labels).fillna(0).astype(int).reset_index()
-    counts.columns = ["Tranche d'âge", "Nombre d'accidents"]
+    # Placer les effectifs de chaque tranche dans sa colonne, les tranches absentes restent à 0
+    if rows:
+        arr = np.asarray(rows, dtype=np.int64)
+        counts[:, arr[:, 0]] = arr[:, 1:].T
     return counts
 
 
 # Fonction pour construire le graphique de type histogramme
-def build_hist_figure(df_hist: pd.DataFrame, y_label: str, hover_label: str):
+# (dict brut passé tel quel à dcc.Graph : pas de validation des graph_objects de Plotly)
+def build_hist_figure(counts: np.ndarray, y_label: str, hover_label: str) -> dict:
     """
     Crée une figure de type histogramme avec les données d'accidents par tranche d'âge.
     """
-    fig = px.bar(
-        df_hist,
-        x="Tranche d'âge",  # Tranches d'âge sur l'axe X
-        y="Nombre d'accidents",  # Nombre d'accidents sur l'axe Y
-        labels={"Tranche d'âge": "Âge", "Nombre d'accidents": y_label},
-    )
-    # Mise en place de l'hover pour afficher des informations détaillées
-    fig.update_traces(hovertemplate=f"%{{x}} ans<br>{hover_label} : %{{y:,}}")
-    
-    # Mise à jour du layout du graphique
-    fig.update_layout(plot_bgcolor="white", paper_bgcolor="white", bargap=0,
-                      margin=dict(l=30, r=30, t=40, b=40))
-    # Configuration des axes X et Y
-    fig.update_xaxes(showgrid=False)
-    fig.update_yaxes(showgrid=True, gridcolor="#e5e7eb", zeroline=True,
-                     rangemode="tozero", tickformat=",d")
-    return fig
+    bar = {
+        "type": "bar",
+        "x": list(AGE_BIN_LABELS),  # Tranches d'âge sur l'axe X
+        "y": counts.tolist(),  # Nombre d'accidents sur l'axe Y
+        "marker": {"color": "#636efa"},  # Couleur par défaut de Plotly Express
+        # Hover pour afficher des informations détaillées
+        "hovertemplate": f"%{{x}} ans<br>{hover_label} : %{{y:,}}<extra></extra>",
+    }
+    layout = {
+        "plot_bgcolor": "white", "paper_bgcolor": "white", "bargap": 0,
+        "margin": {"l": 30, "r": 30, "t": 40, "b": 40},
+        # Configuration des axes X et Y
+        "xaxis": {"title": {"text": "Âge"}, "showgrid": False},
+        "yaxis": {"title": {"text": y_label}, "showgrid": True, "gridcolor": "#e5e7eb", "zeroline": True,
+                  "rangemode": "tozero", "tickformat": ",d"},
+    }
+    return {"data": [bar], "layout": layout}
+
+
+# Figures de toutes les populations (dicts prêts à être envoyés à dcc.Graph), construites ensemble
+# dans un nouveau dict et mises en cache, invalidées si le fichier SQLite est modifié
+@lru_cache(maxsize=4)
+def _cached_figures(db_mtime: float, year: int) -> dict[str, dict]:
+    matrix = _fetch_age_matrix(min_age=14, year=year)
+    return {pop: build_hist_figure(row, y_label, hover)
+            for row, (pop, (_, y_label, hover)) in zip(matrix, POPULATIONS.items())}
+
+
+# Fonction pour récupérer les figures de toutes les populations pour la version actuelle de la base
+def _population_figures() -> dict[str, dict]:
+    db_mtime = DB_FILE.stat().st_mtime if DB_FILE.exists() else 0.0
+    return _cached_figures(db_mtime, YEAR)
 
 
 # Fonction pour définir le layout de la page avec le graphique d'histogramme
@@ -102,19 +124,11 @@ def histogramme_layout(app: dash.Dash):
     Définit le layout de la page avec un graphique représentant les accidents
     par tranche d'âge, ainsi qu'un dropdown pour sélectionner la population à analyser.
     """
-    # Charger les données de base
-    base = load_age_base(YEAR)
-    init = base[base["catu"] == 1] if "catu" in base.columns else base
-    df_hist = make_age_histogram(init, min_age=14)
-
     # Dropdown pour choisir entre le conducteur et les personnes décédées
     dropdown = html.Div(
         dcc.Dropdown(
             id="hist-population",
-            options=[
-                {"label": "Âge du conducteur", "value": "conducteurs"},
-                {"label": "Personnes décédées", "value": "decedes"},
-            ],
+            options=POPULATION_OPTIONS,
             value="conducteurs",
             clearable=False,
             searchable=False,
@@ -122,10 +136,10 @@ def histogramme_layout(app: dash.Dash):
         style={"maxWidth": "420px", "margin": "0 auto 10px auto"},
     )
 
-    # Création du graphique d'histogramme
+    # Création du graphique d'histogramme : la figure est fournie par le callback initial,
+    # les données ne sont donc chargées qu'au premier affichage de la page
     graph = dcc.Graph(
         id="hist-age-graph",
-        figure=build_hist_figure(df_hist, "Nombre d'accidents", "accidents"),
         config={"displayModeBar": False},
         style={"height": "440px"},
     )
@@ -143,24 +157,11 @@ def histogramme_layout(app: dash.Dash):
 @dash.callback(
     Output("hist-age-graph", "figure"),
     Input("hist-population", "value"),
+    prevent_initial_call=False,
 )
 def update_histogram(pop: str):
     """
     Met à jour le graphique de l'histogramme en fonction de la population sélectionnée (conducteurs ou décédés).
     """
-    df = load_age_base(YEAR)
-    pop = (pop or "").lower()
-
-    # Filtrer les données en fonction de la population choisie (conducteurs ou décédés)
-    if pop == "conducteurs":
-        df = df[df["catu"] == 1]
-        y_label, hover = "Nombre d'accidents", "accidents"
-    elif pop == "decedes":
-        df = df[df["grav"] == 2]
-        y_label, hover = "Nombre de décès", "victimes"
-    else:
-        y_label, hover = "Nombre d'accidents", "accidents"
-
-    # Créer l'histogramme et le mettre à jour
-    df_hist = make_age_histogram(df, min_age=14)
-    return build_hist_figure(df_hist, y_label, hover)
+    figs = _population_figures()
+    return figs.get((pop or "").lower(), figs["conducteurs"])
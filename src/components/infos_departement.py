@@ -1,5 +1,5 @@
 from __future__ import annotations
-import sqlite3
+from functools import lru_cache
 from pathlib import Path
 
 import dash
@@ -9,6 +9,7 @@ import pandas as pd
 
 from config import DB_PATH, DEPT_GEOJSON
 from ..utils.data_utils import load_geojson_departments
+from ..utils.sqlite_utils import connect
 from ..components.map_choropleth import BASE_COLOR_MAP
 
 YEAR = 2024  # L'année des données utilisées pour l'analyse
@@ -46,26 +47,44 @@ FALLBACK_NAMES = {
 }
 
 
-# Fonction pour normaliser les codes des départements (ex: gérer les cas 201/202 -> 2A/2B et ajout de zéros pour les autres)
-def _normalize_dep_series(s: pd.Series) -> pd.Series:
+# Fonction pour normaliser un code de département (ex: gérer les cas 201/202 -> 2A/2B et ajout de zéros pour les autres)
+def _normalize_dep_code(code: str) -> str:
     """Gère 201/202 -> 2A/2B et zéro-padding ailleurs (01, 02, ...)."""
-    s = s.astype(str).str.strip().str.upper()  # Convertir en majuscules et enlever les espaces
-    s = s.replace({"201": "2A", "202": "2B"})  # Remplacer les codes de la Corse
-    s = s.where(s.isin(["2A", "2B"]), s.str.zfill(2))  # Appliquer le zéro-padding pour les autres départements
-    return s
+    code = code.strip().upper()  # Convertir en majuscules et enlever les espaces
+    code = {"201": "2A", "202": "2B"}.get(code, code)  # Remplacer les codes de la Corse
+    return code if code in ("2A", "2B") else code.zfill(2)  # Appliquer le zéro-padding pour les autres départements
+
+
+# Fonction pour normaliser les codes des départements d'une série
+def _normalize_dep_series(s: pd.Series) -> pd.Series:
+    """Normalise chaque code distinct une seule fois puis reporte le résultat sur toutes les lignes."""
+    codes, uniques = s.astype(str).factorize()
+    return pd.Series(pd.Index(uniques).map(_normalize_dep_code).take(codes), index=s.index)
+
+
+# Requête du nombre d'accidents par département (texte constant : l'instruction préparée
+# est réutilisée par le cache de sqlite3 sur la connexion partagée)
+_SQL_DEP_COUNTS = """
+    SELECT dep AS dep, COUNT(*) AS n
+    FROM caracteristiques
+    WHERE an = ?
+    GROUP BY dep
+"""
 
 
 # Fonction pour charger le nombre d'accidents par département pour une année donnée
+# (résultat mis en cache par base, date de modification de la base et année)
 def _load_dep_counts(db_file: Path, year: int = YEAR) -> pd.DataFrame:
-    """Retourne dep, n (nb d'accidents) pour l'année donnée."""
-    with sqlite3.connect(db_file) as conn:
-        q = """
-        SELECT dep AS dep, COUNT(*) AS n
-        FROM caracteristiques
-        WHERE an = ?
-        GROUP BY dep
-        """
-        df = pd.read_sql_query(q, conn, params=[year])
+    """Retourne dep, n (nb d'accidents) pour l'année donnée (DataFrame partagé, à ne pas modifier)."""
+    db_file = Path(db_file)
+    return _load_dep_counts_cached(str(db_file.resolve()), db_file.stat().st_mtime_ns, year)
+
+
+@lru_cache(maxsize=4)
+def _load_dep_counts_cached(db_file: str, mtime_ns: int, year: int) -> pd.DataFrame:
+    with connect(db_file) as conn:
+        rows = conn.execute(_SQL_DEP_COUNTS, (year,)).fetchall()
+    df = pd.DataFrame(rows, columns=["dep", "n"])  # ~100 lignes : construites directement depuis les tuples
     df["dep"] = _normalize_dep_series(df["dep"])  # Normaliser les codes des départements
     return df
 
@@ -95,11 +114,16 @@ def _dropdown_options(geojson: dict, ordered_codes: list[str]) -> list[dict]:
     return opts
 
 
+# Options du dropdown calculées une seule fois par fichier GeoJSON (chemin, date de modification)
+@lru_cache(maxsize=4)
+def _dropdown_options_cached(geojson_path: str, mtime_ns: int) -> list[dict]:
+    return _dropdown_options(load_geojson_departments(Path(geojson_path)), _codes_metropole())
+
+
 # Fonction qui définit le layout de la page avec le dropdown et les KPIs de chaque département
 def infos_departement_layout(app: dash.Dash) -> dbc.Card:
     db_file = Path(DB_PATH)
-    geojson = load_geojson_departments(Path(DEPT_GEOJSON))  # Charger les départements du GeoJSON
-
+    geojson_path = Path(DEPT_GEOJSON)
     counts = _load_dep_counts(db_file, YEAR)  # Charger les comptes d'accidents par département
 
     codes96_list = _codes_metropole()  # Liste des départements métropolitains
@@ -131,14 +155,16 @@ def infos_departement_layout(app: dash.Dash) -> dbc.Card:
     depc_all["rang"] = depc_all["n"].rank(method="min", ascending=False).astype(int)  # Ajouter un rang par département
 
     # Sauvegarder les données dans l'app pour pouvoir les utiliser dans les callbacks
+    # (dict code -> {n, class_label, rang} : accès direct par département dans le callback)
     app.server.depc_all = depc_all
+    app.server.depc_map = depc_all.set_index("dep")[["n", "class_label", "rang"]].to_dict("index")
     app.server.total_all = total_all
     app.server.nb_dep_all = nb_dep_all
 
     # Créer le dropdown pour sélectionner un département
     dropdown = dcc.Dropdown(
         id="dep-info-dropdown",
-        options=_dropdown_options(geojson, codes96_list),
+        options=_dropdown_options_cached(str(geojson_path.resolve()), geojson_path.stat().st_mtime_ns),
         placeholder="Choisir un département…",
         clearable=False,
         searchable=True,
@@ -218,20 +244,20 @@ def infos_departement_layout(app: dash.Dash) -> dbc.Card:
         """
         Met à jour les KPIs en fonction du département sélectionné.
         """
-        df_all = app.server.depc_all
+        depc_map = app.server.depc_map
         total_all = app.server.total_all
         nb_dep_all = app.server.nb_dep_all
 
         # Récupérer les données du département sélectionné
-        row = df_all.loc[df_all["dep"] == dep_code]
-        if row.empty:
+        row = depc_map.get(dep_code)
+        if row is None:
             return "—", "—", "—", f"— / {nb_dep_all}"
 
         # Calculer les KPIs pour le département
-        n = int(row["n"].values[0])
+        n = int(row["n"])
         part = (n / total_all * 100.0) if total_all > 0 else 0.0
-        intensite = str(row["class_label"].values[0]) if "class_label" in row else "—"
-        rang = int(row["rang"].values[0])
+        intensite = str(row["class_label"])
+        rang = int(row["rang"])
 
         # Afficher l'intensité avec une couleur spécifique
         color = BASE_COLOR_MAP.get(intensite, "#eceff1")
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import Dict, List, Tuple
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -45,54 +46,52 @@ def _monotonic_rounds(vals):
             r[i] = r[i - 1] + 10  # S'assurer que les valeurs restent croissantes
     return r
 
-# Fonction pour normaliser les codes des départements (gestion des codes comme 201/202 -> 2A/2B)
+# Fonction pour normaliser un code de département (201/202 -> 2A/2B, zéro-padding des autres)
+def _normalize_dep_code(code: str) -> str:
+    code = code.strip().upper()  # Convertir en majuscules et enlever les espaces
+    code = {"201": "2A", "202": "2B"}.get(code, code)  # Remplacer 201 par 2A et 202 par 2B
+    return code if code in ("2A", "2B") else code.zfill(2)  # Ajouter des zéros devant les départements
+
+# Fonction pour normaliser les codes des départements d'une série
+# (une seule normalisation par code distinct, ~100, reportée ensuite sur toutes les lignes)
 def _normalize_dep_series(s: pd.Series) -> pd.Series:
-    s = s.astype(str).str.strip().str.upper()  # Convertir en majuscules et enlever les espaces
-    s = s.replace({"201": "2A", "202": "2B"})  # Remplacer 201 par 2A et 202 par 2B
-    s = s.where(s.isin(["2A", "2B"]), s.str.zfill(2))  # Ajouter des zéros devant les départements
-    return s
+    codes, uniques = s.astype(str).factorize()
+    return pd.Series(pd.Index(uniques).map(_normalize_dep_code).take(codes), index=s.index)
 
 # Fonction pour préparer les classes des départements en fonction du nombre d'accidents
 def prepare_dep_classes(df: pd.DataFrame) -> Tuple[pd.DataFrame, Tuple[int, int, int, int]]:
-    dep = df.dropna(subset=["dep", "Num_Acc"]).copy()  # Enlever les lignes avec des valeurs manquantes
-    dep["dep"] = _normalize_dep_series(dep["dep"])  # Normaliser les codes des départements
+    dep = df.dropna(subset=["dep", "Num_Acc"])  # Enlever les lignes avec des valeurs manquantes
+    pairs = pd.DataFrame({
+        "dep": _normalize_dep_series(dep["dep"]).to_numpy(),  # Normaliser les codes des départements
+        "acc": dep["Num_Acc"].to_numpy(),
+    }).drop_duplicates()  # Un accident n'est compté qu'une fois par département
 
-    # Compter le nombre d'accidents par département
-    depc = (
-        dep.groupby("dep", as_index=False)
-        .agg(accidents=("Num_Acc", "nunique"))
-    )
+    # Compter le nombre d'accidents par département (codes triés, comme un groupby)
+    codes, counts = np.unique(pairs["dep"].to_numpy(dtype=str), return_counts=True)
 
-    depc["rank"] = depc["accidents"].rank(ascending=False, method="min").astype(int)  # Classement des départements
-    total = depc["accidents"].sum()  # Total des accidents
-    depc["share"] = (depc["accidents"] / total * 100.0).round(1)  # Part de chaque département dans le total
+    # Classement des départements (méthode "min", du plus accidentogène au moins accidentogène)
+    rank = counts.size - np.searchsorted(np.sort(counts), counts, side="right") + 1
+    total = counts.sum()  # Total des accidents
+    share = np.round(counts / total * 100.0, 1) if total else np.zeros(counts.size)  # Part de chaque département
 
     # Définir les seuils de gravité pour les départements
-    if not depc.empty and depc["accidents"].nunique() > 1:
-        q1, q2, q3, q4 = depc["accidents"].quantile([0.2, 0.4, 0.6, 0.8]).tolist()  # Quantiles des accidents
-        b1, b2, b3, b4 = _monotonic_rounds([q1, q2, q3, q4])  # Arrondir les quantiles de manière monotone
-
-        def lab(v: float) -> str:
-            """Retourner la catégorie de gravité en fonction du nombre d'accidents"""
-            if v <= b1: return "Très faible"
-            if v <= b2: return "Faible"
-            if v <= b3: return "Moyen"
-            if v <= b4: return "Élevé"
-            return "Très élevé"
-
-        depc["classe"] = depc["accidents"].apply(lab)  # Appliquer la classification sur le nombre d'accidents
+    if counts.size and np.unique(counts).size > 1:
+        q = np.quantile(counts, [0.2, 0.4, 0.6, 0.8])  # Quantiles des accidents
+        b1, b2, b3, b4 = _monotonic_rounds(q.tolist())  # Arrondir les quantiles de manière monotone
+        # Indice de classe : 0 si v <= b1, 1 si b1 < v <= b2, ..., 4 si v > b4
+        class_codes = np.asarray(CLASS_CODE_ORDER)[np.searchsorted([b1, b2, b3, b4], counts, side="left")]
     else:
-        b1 = b2 = b3 = b4 = int(depc["accidents"].max()) if not depc.empty else 0  # Cas où il n'y a qu'une seule valeur
-        depc["classe"] = "Moyen"  # Si les données sont trop homogènes, on les classe comme "Moyen"
-
-    # Mapper les labels de classes aux codes de couleurs
-    depc["classe_code"] = depc["classe"].map({
-        "Très faible": "tf",
-        "Faible":      "fa",
-        "Moyen":       "mo",
-        "Élevé":       "el",
-        "Très élevé":  "te",
-    }).fillna("tf")  # Remplacer les valeurs manquantes par "Très faible"
+        b1 = b2 = b3 = b4 = int(counts.max()) if counts.size else 0  # Cas où il n'y a qu'une seule valeur
+        class_codes = np.full(counts.size, "mo")  # Si les données sont trop homogènes, on les classe comme "Moyen"
+
+    depc = pd.DataFrame({
+        "dep": codes.astype(object),
+        "accidents": counts,
+        "rank": rank,
+        "share": share,
+    })
+    depc["classe_code"] = class_codes.astype(object)  # Codes de couleurs des classes
+    depc["classe"] = depc["classe_code"].map(CODE_TO_KEY)  # Labels des classes
     depc["classe_label"] = depc["classe"]
 
     return depc, (b1, b2, b3, b4)
@@ -113,8 +112,7 @@ def build_map_figure(
         for f in geojson.get("features", [])
     }  # Récupérer les codes des départements autorisés à partir du GeoJSON
 
-    data = depc.copy()  # Copier les données des départements
-    data = data[data["dep"].isin(allowed)].copy()  # Filtrer les départements autorisés
+    data = depc[depc["dep"].isin(allowed)].copy()  # Filtrer les départements autorisés (une seule copie)
 
     # Déterminer les codes sélectionnés
     if selected_codes is None:
@@ -122,14 +120,10 @@ def build_map_figure(
     else:
         sel = set(map(str, selected_codes))  # Sinon, prendre les codes sélectionnés
 
-    # Fonction pour récupérer le label à partir du code
-    def _code_to_key(c: str) -> str:
-        return CODE_TO_KEY.get(c, c)
-
-    # Ajouter une colonne "visible_label" pour déterminer la visibilité des départements sur la carte
-    data["visible_label"] = data["classe_code"].apply(
-        lambda c: _code_to_key(c) if str(c) in sel else "_DIM_"  # Si le département est sélectionné, le rendre visible
-    )
+    # Ajouter une colonne "visible_label" pour déterminer la visibilité des départements sur la carte :
+    # label de la classe si elle est sélectionnée, "_DIM_" sinon (masque booléen vectorisé)
+    codes = data["classe_code"]
+    data["visible_label"] = codes.map(CODE_TO_KEY).fillna(codes).where(codes.astype(str).isin(sel), "_DIM_")
 
     # Créer la carte choroplèthe avec Plotly Express
     color_map = {**BASE_COLOR_MAP}
@@ -1,8 +1,11 @@
-# Script de nettoyage léger des CSV 2024 -> CSV nettoyés dans data/cleaned/
-# Usage :  python clean_data.py
+# Script de nettoyage léger des CSV 2024 -> fichiers Parquet nettoyés dans data/cleaned/
+# Usage :  python clean_data.py          (Parquet, relu par to_sqlite.py sans re-parsing)
+#          python clean_data.py --csv    (CSV, ancien format)
 
 from __future__ import annotations
+import argparse
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 RAW = Path("data/raw")
@@ -15,32 +18,69 @@ FILES = {
     "usagers": RAW / "Usagers_2024.csv",
 }
 
-def _read_csv_any(path: Path) -> pd.DataFrame:
-    """Lecture simple : tente d'abord sep=';' (fréquent sur data.gouv), sinon ','."""
+# Colonnes lues directement comme texte (identifiants, codes avec zéros ou lettres, "2A"/"2B") :
+# évite l'inférence de type sur colonnes mixtes et la conversion en texte faite ensuite
+STR_COLS = {
+    "caract": ("Num_Acc", "Accident_Id", "num_acc", "dep", "com", "hrmn"),
+    "lieux": ("Num_Acc", "num_acc", "voie", "v1", "v2", "pr", "pr1"),
+    "vehicules": ("Num_Acc", "num_acc", "id_vehicule", "num_veh"),
+    "usagers": ("Num_Acc", "num_acc", "id_usager", "id_vehicule", "num_veh"),
+}
+
+# Libellés "HH:MM" des 1440 minutes de la journée, indexés par hh * 60 + mm
+_HEURES = np.array([f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)], dtype=object)
+
+def _read_csv_any(path: Path, str_cols: tuple[str, ...] = ()) -> pd.DataFrame:
+    """
+    Lecture simple : tente d'abord sep=';' (fréquent sur data.gouv), sinon ','.
+    Un fichier à virgules lu avec ';' donne une seule colonne : il est alors relu
+    avec ',' par le parseur C plutôt que découpé cellule par cellule.
+    Les colonnes de str_cols (absentes ignorées) sont lues comme texte, sans inférence de type.
+    """
+    dtype = {c: str for c in str_cols}
     try:
-        return pd.read_csv(path, sep=";", low_memory=False)
+        df = pd.read_csv(path, sep=";", low_memory=False, dtype=dtype)
+        if df.shape[1] > 1:
+            return df
     except Exception:
-        return pd.read_csv(path, sep=",", low_memory=False)
+        pass
+    return pd.read_csv(path, sep=",", low_memory=False, dtype=dtype)
 
 def _std_cols(df: pd.DataFrame) -> pd.DataFrame:
     """
     Standardise basiquement les colonnes :
     - noms en minuscules
     - enlève espaces autour des noms
+    Modifie df en place (DataFrame fraîchement lu, pas de copie défensive) et le retourne.
     """
-    df = df.copy()
     df.columns = [c.strip().lower() for c in df.columns]
     return df
 
 def _norm_num_acc(df: pd.DataFrame) -> pd.DataFrame:
-    """Normalise la clé num_acc si présente : string, trim."""
-    df = df.copy()
-    for k in ("num_acc", "numacc", "num-acc"):
-        if k in df.columns:
-            df["num_acc"] = df[k].astype(str).str.strip()
-            if k != "num_acc":
-                df = df.drop(columns=[k])
-            break
+    """
+    Normalise la clé num_acc si présente : string, trim.
+    La conversion en texte n'est faite que si la colonne n'est pas déjà lue comme texte (STR_COLS).
+    Modifie df en place et le retourne.
+    """
+    k = next((k for k in ("num_acc", "numacc", "num-acc") if k in df.columns), None)
+    if k is None:
+        return df
+    col = df[k]
+    if col.dtype != object:
+        col = col.astype(str)
+    df["num_acc"] = col.str.strip()
+    if k != "num_acc":
+        del df[k]
+    return df
+
+def _to_small_int(df: pd.DataFrame, cols: tuple[str, ...], dtype: str = "Int8") -> pd.DataFrame:
+    """
+    Convertit les colonnes de petits codes entiers (mois, lum, catu, grav...) en entiers
+    compacts nullables : 1 octet par valeur au lieu de 8 en float64.
+    """
+    for c in cols:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(dtype)
     return df
 
 def _clean_caract(df: pd.DataFrame) -> pd.DataFrame:
@@ -60,27 +100,30 @@ def _clean_caract(df: pd.DataFrame) -> pd.DataFrame:
         df.loc[df["dep"].str.fullmatch(r"\d+"), "dep"] = (
             df.loc[df["dep"].str.fullmatch(r"\d+"), "dep"].str.zfill(2)
         )
+        # ~110 codes distincts : stockage en catégories (codes entiers + table des libellés)
+        df["dep"] = df["dep"].astype("category")
 
     # Date (si an/mois/jour existent)
     if all(col in df.columns for col in ("an", "mois", "jour")):
-        df["an"] = pd.to_numeric(df["an"], errors="coerce")
-        df["mois"] = pd.to_numeric(df["mois"], errors="coerce")
-        df["jour"] = pd.to_numeric(df["jour"], errors="coerce")
-        df["date"] = pd.to_datetime(
-            dict(year=df["an"].fillna(2024).astype(int),
-                 month=df["mois"].fillna(1).astype(int).clip(1, 12),
-                 day=df["jour"].fillna(1).astype(int).clip(1, 31)),
-            errors="coerce"
-        )
-
-    # Heure (si 'hrmn' existe, format HHMM)
+        df = _to_small_int(df, ("an",), dtype="Int16")
+        df = _to_small_int(df, ("mois", "jour"))
+        # Clé AAAAMMJJ entière : une année ne compte que ~366 valeurs distinctes,
+        # converties une seule fois chacune grâce à cache=True
+        ymd = (df["an"].fillna(2024).astype("int32") * 10000
+               + df["mois"].fillna(1).astype("int32").clip(1, 12) * 100
+               + df["jour"].fillna(1).astype("int32").clip(1, 31))
+        df["date"] = pd.to_datetime(ymd.astype(str), format="%Y%m%d", errors="coerce", cache=True)
+
+    # Codes de luminosité sur 1 octet
+    df = _to_small_int(df, ("lum",))
+
+    # Heure (si 'hrmn' existe, format HHMM ou HH:MM) : calcul entier puis libellé lu dans _HEURES
     if "hrmn" in df.columns:
-        s = df["hrmn"].astype(str).str.strip().str.zfill(4)
-        hh = pd.to_numeric(s.str.slice(0, 2), errors="coerce").clip(0, 23)
-        mm = pd.to_numeric(s.str.slice(2, 4), errors="coerce").clip(0, 59)
-        df["heure"] = (hh.fillna(0).astype(int).astype(str).str.zfill(2)
-                       + ":" +
-                       mm.fillna(0).astype(int).astype(str).str.zfill(2))
+        hrmn = pd.to_numeric(df["hrmn"].astype(str).str.replace(":", "", regex=False), errors="coerce")
+        hrmn = hrmn.fillna(0).astype("int32")
+        hh = (hrmn // 100).clip(0, 23)
+        mm = (hrmn % 100).clip(0, 59)
+        df["heure"] = _HEURES[(hh * 60 + mm).to_numpy()]
 
     return df
 
@@ -99,7 +142,7 @@ def _clean_vehicules(df: pd.DataFrame) -> pd.DataFrame:
         if cand in df.columns:
             df["id_veh"] = df[cand].astype(str).str.strip()
             if cand != "id_veh":
-                df = df.drop(columns=[cand])
+                del df[cand]
             break
     return df
 
@@ -118,10 +161,16 @@ def _clean_usagers(df: pd.DataFrame) -> pd.DataFrame:
         an_nais = pd.to_numeric(df["an_nais"], errors="coerce")
         df["age"] = (2024 - an_nais).clip(lower=0, upper=110)
 
+    # Catégorie d'usager et gravité sur 1 octet
+    df = _to_small_int(df, ("catu", "grav"))
+
     if "grav" in df.columns:
         #1 Indemne, 2 Tué, 3 Blessé hospitalisé, 4 Blessé léger
         mapping = {1: "Indemne", 2: "Tué", 3: "Hospitalisé", 4: "Léger"}
-        df["grav_label"] = pd.to_numeric(df["grav"], errors="coerce").map(mapping)
+        # Catégorie ordonnée, de la moins grave à la plus grave
+        df["grav_label"] = pd.Categorical(
+            df["grav"].map(mapping), categories=["Indemne", "Léger", "Hospitalisé", "Tué"], ordered=True
+        )
 
     #Harmonise l'id véhicule si relié à la table véhicules
     for cand in ("id_veh", "num_veh", "numveh"):
@@ -131,36 +180,47 @@ def _clean_usagers(df: pd.DataFrame) -> pd.DataFrame:
 
     return df
 
-def _write_clean(df: pd.DataFrame, name_out: str) -> None:
+def _write_clean(df: pd.DataFrame, name_out: str, fmt: str = "parquet") -> None:
+    """
+    Écrit le DataFrame nettoyé dans data/cleaned/<name_out>.<fmt>.
+    Parquet (par défaut) : colonnes typées et compressées, pas de re-parsing à la relecture.
+    """
     CLEAN.mkdir(parents=True, exist_ok=True)
-    out = CLEAN / name_out
-    df.to_csv(out, index=False)
+    out = CLEAN / f"{name_out}.{fmt}"
+    if fmt == "csv":
+        df.to_csv(out, index=False)
+    else:
+        df.to_parquet(out, compression="zstd", index=False)
     print(f"✔ {out} ({len(df):,} lignes)")
 
 def main() -> None:
+    p = argparse.ArgumentParser(description="Nettoyage des CSV 2024 -> data/cleaned")
+    p.add_argument("--csv", action="store_true", help="Écrit des CSV au lieu de fichiers Parquet")
+    fmt = "csv" if p.parse_args().csv else "parquet"
+
     # CARACT
     if not FILES["caract"].exists():
         raise FileNotFoundError(f"Fichier manquant : {FILES['caract']} (lance d'abord get_data.py)")
-    df_car = _clean_caract(_read_csv_any(FILES["caract"]))
-    _write_clean(df_car, "Caract_2024_clean.csv")
+    df_car = _clean_caract(_read_csv_any(FILES["caract"], STR_COLS["caract"]))
+    _write_clean(df_car, "Caract_2024_clean", fmt)
 
     # LIEUX
     if not FILES["lieux"].exists():
         raise FileNotFoundError(f"Fichier manquant : {FILES['lieux']}")
-    df_lieux = _clean_lieux(_read_csv_any(FILES["lieux"]))
-    _write_clean(df_lieux, "Lieux_2024_clean.csv")
+    df_lieux = _clean_lieux(_read_csv_any(FILES["lieux"], STR_COLS["lieux"]))
+    _write_clean(df_lieux, "Lieux_2024_clean", fmt)
 
     # VEHICULES
     if not FILES["vehicules"].exists():
         raise FileNotFoundError(f"Fichier manquant : {FILES['vehicules']}")
-    df_veh = _clean_vehicules(_read_csv_any(FILES["vehicules"]))
-    _write_clean(df_veh, "Vehicules_2024_clean.csv")
+    df_veh = _clean_vehicules(_read_csv_any(FILES["vehicules"], STR_COLS["vehicules"]))
+    _write_clean(df_veh, "Vehicules_2024_clean", fmt)
 
     # USAGERS
     if not FILES["usagers"].exists():
         raise FileNotFoundError(f"Fichier manquant : {FILES['usagers']}")
-    df_usa = _clean_usagers(_read_csv_any(FILES["usagers"]))
-    _write_clean(df_usa, "Usagers_2024_clean.csv")
+    df_usa = _clean_usagers(_read_csv_any(FILES["usagers"], STR_COLS["usagers"]))
+    _write_clean(df_usa, "Usagers_2024_clean", fmt)
 
 if __name__ == "__main__":
     main()
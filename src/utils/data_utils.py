@@ -1,13 +1,58 @@
 from __future__ import annotations
 import json
+import sqlite3
+from functools import lru_cache
 from pathlib import Path
 import pandas as pd
 from .sqlite_utils import load_join_carac_lieux
 
-def load_geojson_departments(path: Path) -> dict:
+# Le GeoJSON est mis en cache par (chemin, date de modification) : il n'est relu que s'il change.
+# Le dict retourné est partagé, il ne doit pas être modifié par l'appelant.
+@lru_cache(maxsize=4)
+def _load_geojson_cached(path: str, mtime_ns: int) -> dict:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def load_geojson_departments(path: Path) -> dict:
+    path = Path(path)
+    return _load_geojson_cached(str(path.resolve()), path.stat().st_mtime_ns)
+
+# Index composites construits par to_sqlite.py (COMPOSITE_INDEXES) : repris ici uniquement pour
+# mettre à niveau les bases construites par une ancienne version du script
+LEGACY_INDEXES = {
+    "idx_carac_an_dep": "CREATE INDEX IF NOT EXISTS idx_carac_an_dep ON caracteristiques(an, dep);",
+    "idx_carac_an_num": "CREATE INDEX IF NOT EXISTS idx_carac_an_num ON caracteristiques(an, num_acc);",
+}
+
+def ensure_indexes(db_path: Path) -> None:
+    """
+    Migration des anciennes bases : crée les index composites absents. Une base construite par
+    to_sqlite.py les contient déjà et n'est alors pas ouverte en écriture.
+    En cas d'échec (base en lecture seule, verrouillée...), un avertissement est affiché :
+    les requêtes restent correctes, seulement plus lentes.
+    """
+    path = Path(db_path)
+    if not path.exists():
+        return
+    conn = sqlite3.connect(f"file:{path.resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+    finally:
+        conn.close()
+    missing = [name for name in LEGACY_INDEXES if name not in names]
+    if not missing or "caracteristiques" not in names:
+        return
+
+    conn = sqlite3.connect(path)
+    try:
+        for name in missing:
+            conn.execute(LEGACY_INDEXES[name])
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Index {missing} non créés (requêtes plus lentes) :", e)
+    finally:
+        conn.close()
+
 def load_accidents(db_path: Path, year: int = 2024) -> pd.DataFrame:
     df = load_join_carac_lieux(db_path, year=year)
     if "dep" in df.columns:
@@ -15,5 +60,5 @@ def load_accidents(db_path: Path, year: int = 2024) -> pd.DataFrame:
         m_num = df["dep"].str.match(r"^\d+$", na=False)
         df.loc[m_num, "dep"] = df.loc[m_num, "dep"].str.zfill(2)
     if "mois" in df.columns:
-        df["mois"] = pd.to_numeric(df["mois"], errors="coerce").astype("Int64")
+        df["mois"] = pd.to_numeric(df["mois"], errors="coerce").astype("Int8")  # 1..12 : 1 octet suffit
     return df
@@ -1,5 +1,10 @@
+import json
+import os
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Optional
 
 #Dossier de sortie
 RAW_DIR = Path("data/raw")
@@ -13,18 +18,169 @@ FILES = {
     "Usagers_2024.csv": "https://www.data.gouv.fr/fr/datasets/r/f57b1f58-386d-4048-8f78-2ebe435df868",
 }
 
+CHUNK_SIZE = 1 << 20  # Écriture par blocs de 1 Mo
+RANGE_PARTS = 4  # Nombre de plages (connexions) par gros fichier
+
+#Session HTTP partagée : connexions (TCP/TLS) réutilisées entre les téléchargements.
+#Le pool doit couvrir toutes les requêtes simultanées (fichiers x plages), sinon urllib3
+#jette les connexions en trop ("Connection pool is full") et perd le keep-alive.
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=len(FILES), pool_maxsize=len(FILES) * RANGE_PARTS)
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+
+MIN_RANGED_SIZE = 8 << 20  # En dessous de 8 Mo, un seul flux suffit
+#Plages d'octets du fichier brut, pas d'une version compressée. Envoyé aussi sur toutes les requêtes
+#dont l'ETag est enregistré ou comparé : beaucoup de serveurs émettent un ETag différent par encodage
+IDENTITY = {"Accept-Encoding": "identity"}
+ETAGS_FILE = RAW_DIR / ".etags.json"  # nom de fichier -> {"etag": ..., "last_modified": ...}
+
+def _load_etags() -> dict:
+    """Lit le fichier d'ETag/Last-Modified (dict vide s'il est absent ou illisible)."""
+    try:
+        return json.loads(ETAGS_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _save_etags(etags: dict) -> None:
+    """Écrit le fichier d'ETag/Last-Modified de façon atomique."""
+    tmp = ETAGS_FILE.with_name(ETAGS_FILE.name + ".tmp")
+    tmp.write_text(json.dumps(etags, indent=2), encoding="utf-8")
+    os.replace(tmp, ETAGS_FILE)
+
+def _validators(headers) -> dict:
+    """Extrait ETag et Last-Modified des en-têtes d'une réponse."""
+    found = {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+    return {k: v for k, v in found.items() if v}
+
+class _NoRangeSupport(Exception):
+    """Le serveur a ignoré l'en-tête Range (réponse 200 au lieu de 206)."""
+
+def _fetch_range(url: str, part: Path, start: int, end: int) -> None:
+    """Télécharge les octets start..end (inclus) et les écrit à leur position dans part."""
+    headers = {**IDENTITY, "Range": f"bytes={start}-{end}"}
+    with SESSION.get(url, headers=headers, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        if r.status_code != 206:
+            raise _NoRangeSupport(url)
+        written = 0
+        with open(part, "r+b") as f:
+            f.seek(start)
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                written += len(chunk)
+    if written != end - start + 1:
+        raise IOError(f"Plage {start}-{end} incomplète ({written} octets reçus) : {url}")
+
+def _ranged_download(url: str, part: Path, parts: int = RANGE_PARTS) -> Optional[dict]:
+    """
+    Télécharge url dans part en `parts` plages parallèles (Range: bytes=a-b).
+    Retourne les ETag/Last-Modified de la réponse HEAD, ou None si le serveur n'annonce pas le support
+    des plages, si la taille est inconnue ou trop petite, ou s'il répond 200 au lieu de 206 :
+    le fichier doit alors être lu en un seul flux.
+    """
+    head = SESSION.head(url, headers=IDENTITY, allow_redirects=True, timeout=60)
+    size = int(head.headers.get("Content-Length") or 0)
+    if (head.status_code != 200 or size < MIN_RANGED_SIZE
+            or head.headers.get("Accept-Ranges", "").lower() != "bytes"):
+        return None
+
+    # Fichier pré-alloué à sa taille finale, chaque plage écrite à son offset
+    with open(part, "wb") as f:
+        f.truncate(size)
+    ranges = [(i * size // parts, (i + 1) * size // parts - 1) for i in range(parts)]
+    try:
+        with ThreadPoolExecutor(max_workers=parts) as ex:
+            for fut in [ex.submit(_fetch_range, head.url, part, a, b) for a, b in ranges]:
+                fut.result()
+    except _NoRangeSupport:
+        return None
+    return _validators(head.headers)
+
+def _stream_to(r: requests.Response, part: Path) -> None:
+    """Écrit le corps de la réponse r dans part, par blocs."""
+    with open(part, "wb") as f:
+        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+            f.write(chunk)
+
+def _fetch_one(name: str, url: str, known: Optional[dict] = None) -> Optional[dict]:
+    """
+    Télécharge un fichier (en plages parallèles si possible, sinon en streaming) dans un .part, renommé une fois complet.
+    Si `known` contient l'ETag/Last-Modified du fichier présent, la requête est conditionnelle :
+    retourne None sur 304 (fichier inchangé), sinon les nouveaux ETag/Last-Modified.
+    """
+    dest = RAW_DIR / name
+    part = dest.with_name(dest.name + ".part")
+    if known:
+        headers = dict(IDENTITY)  # Même encodage que la requête qui a fourni l'ETag
+        if known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        if known.get("last_modified"):
+            headers["If-Modified-Since"] = known["last_modified"]
+        with SESSION.get(url, headers=headers, stream=True, timeout=60) as r:
+            if r.status_code == 304:
+                return None
+            r.raise_for_status()
+            _stream_to(r, part)
+            meta = _validators(r.headers)
+    else:
+        meta = _ranged_download(url, part)
+        if meta is None:
+            with SESSION.get(url, headers=IDENTITY, stream=True, timeout=60) as r:
+                r.raise_for_status()
+                _stream_to(r, part)
+                meta = _validators(r.headers)
+    os.replace(part, dest)  # Jamais de fichier partiel sous le nom final
+    return meta
+
 def download_csv_files():
-    """Télécharge les 4 fichiers CSV dans data/raw"""
+    """
+    Télécharge les 4 fichiers CSV dans data/raw (en parallèle).
+    Un fichier déjà présent n'est revérifié que si son ETag/Last-Modified est connu (data/raw/.etags.json) :
+    requête conditionnelle, rien n'est retéléchargé sur 304.
+    """
+    etags = _load_etags()
+    todo = {}
     for name, url in FILES.items():
-        dest = RAW_DIR / name
-        if dest.exists():
+        if not (RAW_DIR / name).exists():
+            todo[name] = None
+        elif etags.get(name):
+            todo[name] = etags[name]
+        else:
             print(f"✔ {name} déjà présent")
-            continue
-        print(f"Téléchargement de {name}...")
-        r = requests.get(url)
-        r.raise_for_status()
-        dest.write_bytes(r.content)
-        print(f"✔ {name} téléchargé dans {dest}")
+    if not todo:
+        return
+
+    errors = {}
+    try:
+        with ThreadPoolExecutor(max_workers=len(todo)) as ex:
+            futures = {}
+            for name, known in todo.items():
+                print(f"Vérification de {name}..." if known else f"Téléchargement de {name}...")
+                futures[ex.submit(_fetch_one, name, FILES[name], known)] = name
+            for fut in as_completed(futures):
+                name = futures[fut]
+                try:
+                    meta = fut.result()
+                except Exception as e:
+                    # Erreur mémorisée : les autres fichiers terminent et leurs ETag sont conservés
+                    print(f"✘ {name} : {e}")
+                    errors[name] = e
+                    continue
+                if meta is None:
+                    print(f"✔ {name} à jour")
+                    continue
+                print(f"✔ {name} téléchargé dans {RAW_DIR / name}")
+                if meta:
+                    etags[name] = meta
+                else:
+                    etags.pop(name, None)
+    finally:
+        # Toujours écrit, même en cas d'échec : les fichiers déjà remplacés restent revalidables
+        _save_etags(etags)
+    if errors:
+        # Propage la première erreur HTTP rencontrée
+        raise next(iter(errors.values()))
 
 if __name__ == "__main__":
     download_csv_files()
@@ -1,22 +1,118 @@
 from __future__ import annotations
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict, Any, Iterable, Tuple
+from typing import Optional, Dict, Any, Iterable, Iterator, Tuple
 import pandas as pd
 
 
-def connect(db_path: Path) -> sqlite3.Connection:
-    """Connexion SQLite en lecture seule, compatible Windows."""
+# PRAGMAs appliqués à chaque connexion de lecture (tableau de bord)
+READ_PRAGMAS = (
+    "PRAGMA query_only=ON;",
+    "PRAGMA cache_size=-65536;",  # Cache de pages de 64 Mo
+    "PRAGMA mmap_size=268435456;",  # Lecture du fichier via mmap (256 Mo)
+    "PRAGMA temp_store=MEMORY;",
+)
+
+
+def _open_ro(db_path: Path) -> sqlite3.Connection:
+    """Ouvre une connexion SQLite en lecture seule (cache privé), compatible Windows."""
     p = Path(db_path).expanduser().resolve()
     if not p.exists():
         raise FileNotFoundError(f"Base SQLite introuvable : {p}")
-    uri = f"file:{p.as_posix()}?mode=ro"
+    uri = f"file:{p.as_posix()}?mode=ro&cache=private"
     conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
     conn.execute("PRAGMA foreign_keys=ON;")
+    for pragma in READ_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
 
+# Pool de connexions en lecture seule, par base : au plus POOL_SIZE connexions ouvertes,
+# réutilisées d'un appel à l'autre (plusieurs callbacks Dash peuvent lire en parallèle).
+# Chaque pool est lié à l'identité du fichier (inode, mtime) : une base reconstruite
+# (to_sqlite --overwrite) obtient un nouveau pool et les connexions de l'ancien sont fermées.
+POOL_SIZE = min(4, os.cpu_count() or 1)
+_POOLS: Dict[str, Tuple[Tuple[int, int], queue.LifoQueue, list]] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _file_identity(key: str) -> Tuple[int, int]:
+    """(inode, mtime en ns) du fichier de la base : change dès que la base est recréée ou modifiée."""
+    try:
+        st = os.stat(key)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Base SQLite introuvable : {key}") from None
+    return st.st_ino, st.st_mtime_ns
+
+
+def _close_idle(pool: queue.LifoQueue) -> None:
+    """Ferme les connexions libres d'un pool remplacé."""
+    while True:
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            return
+        if conn is not None:
+            conn.close()
+
+
+def _borrow(key: str) -> Tuple[queue.LifoQueue, sqlite3.Connection]:
+    """Emprunte une connexion libre du pool de la base, en ouvre une si le pool n'est pas plein, sinon attend."""
+    ident = _file_identity(key)
+    with _POOLS_LOCK:
+        entry = _POOLS.get(key)
+        if entry is None or entry[0] != ident:
+            # Base recréée ou modifiée : les anciennes connexions liraient un fichier périmé
+            if entry is not None:
+                _close_idle(entry[1])
+            entry = _POOLS[key] = (ident, queue.LifoQueue(), [0])
+        _, pool, opened = entry
+        try:
+            return pool, pool.get_nowait()
+        except queue.Empty:
+            if opened[0] < POOL_SIZE:
+                conn = _open_ro(Path(key))
+                opened[0] += 1
+                return pool, conn
+    conn = pool.get()
+    if conn is None:
+        # Pool remplacé pendant l'attente : on emprunte dans le nouveau
+        return _borrow(key)
+    return pool, conn
+
+
+def _release(key: str, pool: queue.LifoQueue, conn: sqlite3.Connection) -> None:
+    """Rend la connexion à son pool, ou la ferme si ce pool a été remplacé entre-temps."""
+    if conn.in_transaction:
+        conn.rollback()
+    with _POOLS_LOCK:
+        entry = _POOLS.get(key)
+        if entry is not None and entry[1] is pool:
+            pool.put(conn)
+            return
+    conn.close()
+    pool.put(None)  # Réveille un éventuel appel en attente sur l'ancien pool
+
+
+@contextmanager
+def connect(db_path: Path) -> Iterator[sqlite3.Connection]:
+    """
+    Connexion SQLite en lecture seule empruntée au pool de la base, rendue (pas fermée) en sortie de bloc :
+        with connect(db_path) as conn: ...
+    """
+    key = str(Path(db_path).expanduser().resolve())
+    pool, conn = _borrow(key)
+    try:
+        yield conn
+    finally:
+        _release(key, pool, conn)
+
+
 def _list_tables(conn: sqlite3.Connection) -> list[str]:
     cur = conn.execute("""
         SELECT name FROM sqlite_master
@@ -25,6 +121,14 @@ def _list_tables(conn: sqlite3.Connection) -> list[str]:
     return [r[0] for r in cur.fetchall()]
 
 
+def has_table(conn: sqlite3.Connection, name: str) -> bool:
+    """Indique si la table `name` existe dans la base."""
+    cur = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ? LIMIT 1", (name,)
+    )
+    return cur.fetchone() is not None
+
+
 def _resolve_table_names(conn: sqlite3.Connection) -> tuple[str, str]:
     """
     Tente de trouver les tables équivalentes à 'caracteristiques' et 'lieux'
@@ -76,99 +180,132 @@ def read_table(
     if limit:
         q += f" LIMIT {int(limit)}"
     with connect(db_path) as conn:
-        return pd.read_sql(q, conn, params=params)
+        cur = conn.execute(q, params or ())
+        return pd.DataFrame.from_records(cur.fetchall(), columns=[d[0] for d in cur.description])
 
 
 
 # Lecture combinée caractéristiques + lieux 
 
-def load_join_carac_lieux(db_path: Path, year: Optional[int] = None) -> pd.DataFrame:
-    """Charge les données en aliasant dynamiquement les colonnes vers des noms standard.
-       Joint 'lieux' uniquement si la colonne 'catr' existe EXACTEMENT et si on connaît la clé accident côté 'lieux'.
+# Résolution des noms de tables/colonnes mise en cache par base, invalidée quand le fichier est remplacé
+# ou modifié (même identité (inode, mtime) que le pool de connexions : une base recréée au même chemin
+# peut avoir le même PRAGMA schema_version) ou quand le schéma change
+_SCHEMA_CACHE: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Optional[str]]]] = {}
+
+
+def _resolve_join_columns(conn: sqlite3.Connection) -> Dict[str, Optional[str]]:
+    """
+    Trouve les tables 'caracteristiques'/'lieux' et les colonnes utilisées par load_join_carac_lieux,
+    en tolérant les variantes de nom. Retourne un dict nom standard -> nom réel (None si absente).
     """
     def _list_cols(conn, table: str) -> list[str]:
         rows = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
         return [r[1] for r in rows]
 
-    def pick_exact(colnames: list[str], target: str) -> Optional[str]:
-        for name in colnames:
-            if name.lower() == target.lower():
-                return name
-        return None
+    def first(lower_to_orig: Dict[str, str], candidates: Tuple[str, ...]) -> Optional[str]:
+        return next((lower_to_orig[k] for k in candidates if k in lower_to_orig), None)
 
-    def pick_any(colnames: list[str], candidates: list[str]) -> Optional[str]:
-        lowset = {c.lower() for c in colnames}
-        for cand in candidates:
-            if cand.lower() in lowset:
-                for n in colnames:
-                    if n.lower() == cand.lower():
-                        return n
-        return None
+    t_carac, t_lieux = _resolve_table_names(conn)
+    carac_cols = _list_cols(conn, t_carac)
+    lieux_cols = _list_cols(conn, t_lieux)
+    # Nom en minuscules -> nom réel, construit une seule fois par table
+    _c = {c.lower(): c for c in carac_cols}
+    _l = {c.lower(): c for c in lieux_cols}
+
+    # Colonnes côté caracteristiques
+    cols: Dict[str, Optional[str]] = {
+        "t_carac":   t_carac,
+        "t_lieux":   t_lieux,
+        "acc_carac": first(_c, ("num_acc", "numacc", "num_accident", "accident")),
+        "year_col":  first(_c, ("an", "annee", "année", "year")),
+        "mois_col":  first(_c, ("mois", "month")),
+        "dep_col":   first(_c, ("dep", "departement", "département", "code_dep", "dep_code")),
+        "hrmn_col":  first(_c, ("hrmn", "heure", "time")),
+        "lat_col":   first(_c, ("lat", "latitude")),
+        "lon_col":   first(_c, ("long", "lon", "longitude")),
+    }
+
+    # Colonnes indispensables min
+    required = {"Num_Acc": cols["acc_carac"], "an": cols["year_col"], "mois": cols["mois_col"], "dep": cols["dep_col"]}
+    missing = [k for k, v in required.items() if v is None]
+    if missing:
+        raise RuntimeError(
+            "Colonnes indispensables introuvables dans 'caracteristiques'. "
+            f"Manquantes (alias attendus): {missing}\n"
+            f"Colonnes disponibles: {carac_cols}"
+        )
+
+    # Côté lieux 
+    cols["acc_lieux"] = _l.get("num_acc")
+    cols["catr_col"]  = _l.get("catr")  # EXACTEMENT 'catr'
+    return cols
+
+
+# Requêtes de jointure déjà construites, par (base, identité du fichier et version du schéma, filtre année)
+_JOIN_SQL: Dict[Tuple[str, Tuple[int, int, int], bool], str] = {}
 
+
+def _build_join_sql(cols: Dict[str, Optional[str]], with_year: bool) -> str:
+    """Construit la requête standardisée (colonnes aliasées, jointure 'lieux' si possible, filtre :year)."""
+    t_carac, t_lieux = cols["t_carac"], cols["t_lieux"]
+    acc_carac, year_col, mois_col, dep_col = cols["acc_carac"], cols["year_col"], cols["mois_col"], cols["dep_col"]
+    hrmn_col, lat_col, lon_col = cols["hrmn_col"], cols["lat_col"], cols["lon_col"]
+    acc_lieux, catr_col = cols["acc_lieux"], cols["catr_col"]
+
+    join_lieux = (acc_lieux is not None) and (catr_col is not None)
+
+    # Filtre année
+    where_sql = f'WHERE c."{year_col}" = :year' if with_year else ""
+
+    #SELECT standardisé
+    select_parts = [
+        f'c."{acc_carac}"  AS "Num_Acc"',
+        f'c."{year_col}"   AS "an"',
+        f'c."{mois_col}"   AS "mois"',
+        f'c."{dep_col}"    AS "dep"',
+    ]
+    if hrmn_col: select_parts.append(f'c."{hrmn_col}" AS "hrmn"')
+    if lat_col:  select_parts.append(f'c."{lat_col}"  AS "lat"')
+    if lon_col:  select_parts.append(f'c."{lon_col}"  AS "long"')
+
+    if join_lieux:
+        select_sql = ", ".join(select_parts + [f'l."{catr_col}" AS "catr"'])
+        return f'''
+            SELECT {select_sql}
+            FROM "{t_carac}" c
+            LEFT JOIN "{t_lieux}" l ON l."{acc_lieux}" = c."{acc_carac}"
+            {where_sql}
+        '''
+    select_sql = ", ".join(select_parts)
+    return f'''
+        SELECT {select_sql}
+        FROM "{t_carac}" c
+        {where_sql}
+    '''
+
+
+def load_join_carac_lieux(db_path: Path, year: Optional[int] = None) -> pd.DataFrame:
+    """Charge les données en aliasant dynamiquement les colonnes vers des noms standard.
+       Joint 'lieux' uniquement si la colonne 'catr' existe EXACTEMENT et si on connaît la clé accident côté 'lieux'.
+    """
+    key = str(Path(db_path).expanduser().resolve())
     with connect(db_path) as conn:
-        t_carac, t_lieux = _resolve_table_names(conn)
-        carac_cols = _list_cols(conn, t_carac)
-        lieux_cols = _list_cols(conn, t_lieux)
-
-        # Colonnes côté caracteristiques
-        acc_carac  = pick_any(carac_cols, ["num_acc", "Num_Acc", "numacc", "num_accident", "accident"])
-        year_col   = pick_any(carac_cols, ["an", "annee", "année", "year"])
-        mois_col   = pick_any(carac_cols, ["mois", "month"])
-        dep_col    = pick_any(carac_cols, ["dep", "departement", "département", "code_dep", "dep_code"])
-        hrmn_col   = pick_any(carac_cols, ["hrmn", "heure", "time"])
-        lat_col    = pick_any(carac_cols, ["lat", "latitude"])
-        lon_col    = pick_any(carac_cols, ["long", "lon", "longitude"])
-
-        # Colonnes indispensables min
-        required = {"Num_Acc": acc_carac, "an": year_col, "mois": mois_col, "dep": dep_col}
-        missing = [k for k, v in required.items() if v is None]
-        if missing:
-            raise RuntimeError(
-                "Colonnes indispensables introuvables dans 'caracteristiques'. "
-                f"Manquantes (alias attendus): {missing}\n"
-                f"Colonnes disponibles: {carac_cols}"
-            )
-
-        # Côté lieux 
-        acc_lieux = pick_any(lieux_cols, ["num_acc", "Num_Acc"])
-        catr_col  = pick_exact(lieux_cols, "catr")  # EXACTEMENT 'catr'
-
-        join_lieux = (acc_lieux is not None) and (catr_col is not None)
-
-        # Filtre année
-        where = []
-        params: Dict[str, Any] = {}
-        if year is not None and year_col is not None:
-            where.append(f'c."{year_col}" = :year')
-            params["year"] = int(year)
-        where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-
-        #SELECT standardisé
-        select_parts = [
-            f'c."{acc_carac}"  AS "Num_Acc"',
-            f'c."{year_col}"   AS "an"',
-            f'c."{mois_col}"   AS "mois"',
-            f'c."{dep_col}"    AS "dep"',
-        ]
-        if hrmn_col: select_parts.append(f'c."{hrmn_col}" AS "hrmn"')
-        if lat_col:  select_parts.append(f'c."{lat_col}"  AS "lat"')
-        if lon_col:  select_parts.append(f'c."{lon_col}"  AS "long"')
-
-        if join_lieux:
-            select_sql = ", ".join(select_parts + [f'l."{catr_col}" AS "catr"'])
-            q = f'''
-                SELECT {select_sql}
-                FROM "{t_carac}" c
-                LEFT JOIN "{t_lieux}" l ON l."{acc_lieux}" = c."{acc_carac}"
-                {where_sql}
-            '''
+        # Noms résolus réutilisés tant que le fichier et le schéma de la base n'ont pas changé
+        version = (*_file_identity(key), conn.execute("PRAGMA schema_version").fetchone()[0])
+        cached = _SCHEMA_CACHE.get(key)
+        if cached is not None and cached[0] == version:
+            cols = cached[1]
         else:
-            select_sql = ", ".join(select_parts)
-            q = f'''
-                SELECT {select_sql}
-                FROM "{t_carac}" c
-                {where_sql}
-            '''
+            cols = _resolve_join_columns(conn)
+            _SCHEMA_CACHE[key] = (version, cols)
 
-        return pd.read_sql(q, conn, params=params or None)
+        # Requête construite une seule fois par (base, version du fichier et du schéma, filtre année ou non)
+        with_year = year is not None and cols["year_col"] is not None
+        sql_key = (key, version, with_year)
+        q = _JOIN_SQL.get(sql_key)
+        if q is None:
+            q = _JOIN_SQL[sql_key] = _build_join_sql(cols, with_year)
 
+        # Lignes lues directement en tuples (instruction préparée réutilisée par le cache de sqlite3)
+        cur = conn.execute(q, {"year": int(year)} if with_year else {})
+        return pd.DataFrame.from_records(cur.fetchall(), columns=[d[0] for d in cur.description])
@@ -1,13 +1,20 @@
 """
-Conversion CSV nettoyés -> base SQLite utilisée par le dashboard.
+Conversion fichiers nettoyés (Parquet ou CSV) -> base SQLite utilisée par le dashboard.
 Lit les fichiers de data/cleaned et crée les tables:
 - caracteristiques, lieux, vehicules (import direct)
 - usagers (schema propre: num_acc, catu, grav)
 """
 
 import argparse
+import datetime
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from decimal import Decimal
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 from pathlib import Path
 import re
 
@@ -19,6 +26,43 @@ INDEXES = {
     "usagers": ["num_acc", "catu", "grav", "an_nais"],
 }
 
+# Index composites utilisés par les requêtes du dashboard (filtre sur l'année puis GROUP BY / jointure)
+COMPOSITE_INDEXES = {
+    "caracteristiques": {"idx_carac_an_dep": ["an", "dep"], "idx_carac_an_num": ["an", "num_acc"]},
+}
+
+# Types imposés à la création des tables (prioritaires sur les types déduits des colonnes) :
+# clés de jointure et codes numériques en INTEGER, même s'ils ont été nettoyés en texte
+# (l'affinité INTEGER de SQLite stocke alors '202400000001' comme un entier). 'dep' reste en TEXT (01, 2A).
+COLUMN_TYPES = {
+    "caracteristiques": {"num_acc": "INTEGER", "an": "INTEGER", "mois": "INTEGER", "jour": "INTEGER",
+                         "lum": "INTEGER", "dep": "TEXT", "hrmn": "TEXT"},
+    "lieux": {"num_acc": "INTEGER", "catr": "INTEGER", "circ": "INTEGER"},
+    "vehicules": {"num_acc": "INTEGER", "catv": "INTEGER"},
+}
+
+# Tables de synthèse lues par le dashboard : comptes pré-agrégés par année
+# (majeur = 1 si l'usager a au moins 18 ans l'année de l'accident, 0 sinon, NULL si an_nais inconnu)
+SUMMARY_TABLES = {
+    "accident_grav_by_year": """
+        SELECT c.an AS an, u.catu AS catu,
+               CASE WHEN u.an_nais IS NULL THEN NULL
+                    WHEN u.an_nais <= c.an - 18 THEN 1 ELSE 0 END AS majeur,
+               u.grav AS grav, COUNT(*) AS n
+        FROM usagers u
+        JOIN caracteristiques c ON c.num_acc = u.num_acc
+        GROUP BY 1, 2, 3, 4
+    """,
+    "accident_by_month": """
+        SELECT an, mois, COUNT(*) AS n
+        FROM caracteristiques
+        GROUP BY an, mois
+    """,
+}
+
+# Extensions des fichiers nettoyés acceptés en entrée (Parquet prioritaire sur CSV à nom égal)
+INPUT_SUFFIXES = (".parquet", ".csv")
+
 # Alias permettant de trouver les tables dans les fichiers CSV
 ALIASES = {
     "caracteristiques": "caracteristiques",
@@ -29,6 +73,12 @@ ALIASES = {
     "veh": "vehicules",
 }
 
+# Expressions régulières compilées une seule fois : alias (dans l'ordre de ALIASES, le premier
+# alias trouvé dans le nom l'emporte) et nettoyage des noms de fichiers
+_ALIAS_RE = re.compile("|".join(re.escape(k) for k in ALIASES))
+_INVALID_CHARS_RE = re.compile(r"[^a-z0-9_]+")
+_UNDERSCORES_RE = re.compile(r"_+")
+
 # Fonction pour deviner le nom de la table à partir du nom du fichier CSV
 def guess_table_name(path: Path) -> str:
     """
@@ -36,21 +86,29 @@ def guess_table_name(path: Path) -> str:
     Remplace les caractères non valides dans le nom du fichier pour créer un nom de table valide.
     """
     stem = path.stem.lower()
-    for k, v in ALIASES.items():
-        if k in stem:
-            return v
+    # Premier alias de ALIASES présent dans le nom (même priorité que le parcours du dict)
+    found = {m.group(0) for m in _ALIAS_RE.finditer(stem)}
+    for k in ALIASES:
+        if k in found:
+            return ALIASES[k]
     # Nettoyage du nom du fichier pour l'adapter à un format compatible avec SQLite
-    name = re.sub(r"[^a-z0-9_]+", "_", stem)
-    return re.sub(r"_+", "_", name).strip("_")
+    name = _INVALID_CHARS_RE.sub("_", stem)
+    return _UNDERSCORES_RE.sub("_", name).strip("_")
 
 # Fonction pour se connecter à la base de données SQLite
 def connect_sqlite(db_path: Path) -> sqlite3.Connection:
     """
-    Se connecte à la base SQLite et désactive les journaux et la synchronisation pour améliorer les performances.
+    Se connecte à la base SQLite et désactive les journaux et la synchronisation pour améliorer les performances
+    (profil d'import en masse : gros cache, fichiers temporaires en mémoire, verrou exclusif).
     """
     conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA page_size=32768;")  # Pages de 32 Ko (appliqué à la création, ou au VACUUM final)
     conn.execute("PRAGMA journal_mode=OFF;")  # Désactivation du journalisation
     conn.execute("PRAGMA synchronous=OFF;")  # Désactivation de la synchronisation pour plus de rapidité
+    conn.execute("PRAGMA cache_size=-262144;")  # Cache de pages de 256 Mo pendant l'import
+    conn.execute("PRAGMA temp_store=MEMORY;")  # Tris temporaires (index, GROUP BY) en mémoire
+    conn.execute("PRAGMA mmap_size=1073741824;")  # Lecture du fichier via mmap (1 Go)
+    conn.execute("PRAGMA locking_mode=EXCLUSIVE;")  # Seul processus sur la base pendant l'import
     return conn
 
 # Fonction pour harmoniser les colonnes des DataFrames afin qu'elles aient des noms cohérents
@@ -58,34 +116,195 @@ def _harmonize_cols(df: pd.DataFrame) -> pd.DataFrame:
     """
     Harmonise les noms des colonnes en les mettant en minuscules et en supprimant les espaces.
     Si la colonne "num_acc" n'existe pas, la recherche et la renomme si nécessaire.
+    Modifie df en place (seuls les noms de colonnes changent, les données ne sont pas copiées) et le retourne.
     """
-    df = df.copy()
-    df.columns = [c.strip().lower() for c in df.columns]  # Nettoyage des noms de colonnes
-    if "num_acc" not in df.columns:
-        for c in df.columns:
-            if c.replace("_", "").lower() == "numacc":
-                df = df.rename(columns={c: "num_acc"})  # Renommer la colonne si nécessaire
-                break
+    df.columns = _harmonize_names(df.columns)
     return df
 
-# Fonction pour importer une table depuis un fichier CSV dans la base de données SQLite
+# Fonction pour harmoniser une liste de noms de colonnes
+def _harmonize_names(names) -> list[str]:
+    names = [c.strip().lower() for c in names]  # Nettoyage des noms de colonnes
+    if "num_acc" not in names:
+        for i, c in enumerate(names):
+            if c.replace("_", "") == "numacc":
+                names[i] = "num_acc"  # Renommer la colonne si nécessaire
+                break
+    return names
+
+# Colonnes des CSV nettoyés toujours lues comme texte, quel que soit le parseur : sans type imposé,
+# pyarrow lit 'hrmn'/'heure' ("08:07") en datetime.time et 'date' en datetime.date, et le parseur C
+# perd les zéros de tête de 'dep'/'com' ("01")
+CSV_TEXT_COLS = ("hrmn", "heure", "date", "dep", "com", "adr", "lat", "long")
+
+# Tentatives de lecture des CSV nettoyés après le parseur Arrow (clean_data.py --csv écrit avec ',') :
+# parseur C, la détection automatique du séparateur (parseur Python, lent) n'intervenant qu'en dernier recours
+CSV_ATTEMPTS = (
+    {"sep": ",", "engine": "c", "low_memory": False},
+    {"sep": ";", "engine": "c", "low_memory": False},
+)
+
+# Fonction pour lire un CSV nettoyé avec le parseur Arrow, colonnes de CSV_TEXT_COLS en texte
+def _read_arrow_csv(csv_path: Path) -> pd.DataFrame:
+    convert = pacsv.ConvertOptions(
+        column_types={c: pa.string() for c in CSV_TEXT_COLS},  # Colonnes absentes du fichier ignorées
+        strings_can_be_null=True,  # Cellules vides -> NULL, comme avec le parseur C
+    )
+    return pacsv.read_csv(csv_path, convert_options=convert).to_pandas()
+
+# Fonction pour lire un CSV nettoyé avec le parseur le plus rapide qui le découpe correctement
+def _read_clean_csv(csv_path: Path) -> pd.DataFrame:
+    try:
+        df = _read_arrow_csv(csv_path)
+        if df.shape[1] > 1:
+            return df
+    except Exception:
+        pass  # Fichier illisible avec ',' par Arrow
+    dtype = {c: str for c in CSV_TEXT_COLS}  # Colonnes absentes ignorées
+    for opts in CSV_ATTEMPTS:
+        try:
+            df = pd.read_csv(csv_path, dtype=dtype, **opts)
+        except Exception:
+            continue  # Fichier illisible avec ces options
+        if df.shape[1] > 1:
+            return df
+    return pd.read_csv(csv_path, sep=None, engine="python", dtype=dtype)
+
+# Fonction pour déterminer le type SQLite d'une colonne pandas
+def _sqlite_type(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+# Transaction d'import : ouverte (BEGIN IMMEDIATE) si aucune n'est en cours, sinon celle de l'appelant
+# est réutilisée, afin qu'un fichier complet (DROP, CREATE et insertions) soit importé en une transaction
+@contextmanager
+def _transaction(conn: sqlite3.Connection):
+    if conn.in_transaction:
+        yield
+        return
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+# Instructions INSERT déjà construites, par (table, colonnes)
+_INSERT_SQL: dict[tuple[str, tuple[str, ...]], str] = {}
+
+# Fonction pour construire (une seule fois par table) l'instruction INSERT paramétrée
+def _insert_sql(table: str, cols: tuple[str, ...]) -> str:
+    key = (table, cols)
+    if key not in _INSERT_SQL:
+        _INSERT_SQL[key] = f'INSERT INTO "{table}" ({", ".join(cols)}) VALUES ({", ".join("?" * len(cols))});'
+    return _INSERT_SQL[key]
+
+# Types de colonnes objet (pd.api.types.infer_dtype) pouvant contenir des valeurs que sqlite3 ne lie pas
+_UNBOUND_KINDS = {"date", "time", "datetime", "decimal", "mixed"}
+
+# Fonction pour convertir une valeur Python non liable par sqlite3, comme le faisait DataFrame.to_sql
+# (date/heure au format ISO, Decimal en float) ; les autres valeurs sont rendues telles quelles
+def _sqlite_value(v):
+    if isinstance(v, datetime.datetime):
+        return v.isoformat(" ")
+    if isinstance(v, (datetime.date, datetime.time)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
+    return v
+
+# Fonction pour écrire un DataFrame dans une table SQLite en une seule transaction
+def write_sqlite(df: pd.DataFrame, table: str, conn: sqlite3.Connection, create: bool = True) -> None:
+    """
+    Insère toutes les lignes de df dans `table` avec un seul executemany, dans une seule transaction.
+    Si create=True, la table est (re)créée d'après les types des colonnes ; sinon elle doit exister.
+    Les valeurs manquantes sont écrites en NULL, les dates au format 'AAAA-MM-JJ HH:MM:SS',
+    les date/time Python des colonnes objet au format ISO et les Decimal en float.
+    """
+    cols = [f'"{c}"' for c in df.columns]
+    if create:
+        conn.execute(f'DROP TABLE IF EXISTS "{table}";')
+        types = COLUMN_TYPES.get(table, {})
+        defs = ", ".join(f'"{c}" {types.get(c, _sqlite_type(t))}' for c, t in zip(df.columns, df.dtypes))
+        conn.execute(f'CREATE TABLE "{table}" ({defs});')
+
+    # Valeurs en objets Python (int, float, str) liables directement par sqlite3, NA -> None
+    # (une seule conversion du DataFrame ; seules les colonnes de dates et les colonnes objet
+    # contenant des date/time/Decimal sont reformatées)
+    values = df.astype(object)
+    for c in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[c]):
+            values[c] = df[c].dt.strftime("%Y-%m-%d %H:%M:%S")
+        elif df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True) in _UNBOUND_KINDS:
+            values[c] = df[c].map(_sqlite_value)
+    values = values.where(df.notna(), None)
+
+    # Une seule instruction INSERT préparée pour la table, liée ligne par ligne par executemany
+    sql = _insert_sql(table, tuple(cols))
+    with _transaction(conn):  # Une seule transaction pour toutes les lignes (COMMIT à la fin, ROLLBACK si erreur)
+        conn.executemany(sql, values.itertuples(index=False, name=None))
+
+# Fonction pour déterminer le type SQLite d'une colonne Arrow
+def _arrow_sqlite_type(t: pa.DataType) -> str:
+    if pa.types.is_dictionary(t):
+        t = t.value_type  # Colonne catégorielle : type des valeurs
+    if pa.types.is_integer(t) or pa.types.is_boolean(t):
+        return "INTEGER"
+    if pa.types.is_floating(t):
+        return "REAL"
+    return "TEXT"
+
+# Fonction pour importer un fichier Parquet par lots Arrow, sans DataFrame pandas intermédiaire
+def import_parquet(conn: sqlite3.Connection, path: Path, table: str, batch_size: int = 100_000) -> None:
+    """
+    (Re)crée `table` d'après le schéma Arrow du fichier puis insère les lots (RecordBatch) un par un
+    avec executemany, le tout dans une seule transaction. Mémoire bornée à un lot.
+    """
+    pf = pq.ParquetFile(path)
+    schema = pf.schema_arrow
+    names = _harmonize_names(schema.names)
+    cols = [f'"{c}"' for c in names]
+    conn.execute(f'DROP TABLE IF EXISTS "{table}";')
+    types = COLUMN_TYPES.get(table, {})
+    defs = ", ".join(f'"{c}" {types.get(c, _arrow_sqlite_type(f.type))}' for c, f in zip(names, schema))
+    conn.execute(f'CREATE TABLE "{table}" ({defs});')
+
+    sql = _insert_sql(table, tuple(cols))
+    with _transaction(conn):  # Une seule transaction pour tout le fichier
+        for batch in pf.iter_batches(batch_size=batch_size):
+            # Dates au même format que write_sqlite ('AAAA-MM-JJ HH:MM:SS' : texte d'un timestamp à la seconde),
+            # les autres colonnes sont converties telles quelles
+            arrays = [a.cast(pa.timestamp("s"), safe=False).cast(pa.string()) if pa.types.is_timestamp(a.type) else a
+                      for a in batch.columns]
+            conn.executemany(sql, zip(*(a.to_pylist() for a in arrays)))
+
+# Fonction pour importer une table depuis un fichier nettoyé (Parquet ou CSV) dans la base de données SQLite
 def import_table(conn, csv_path: Path, table: str):
     """
-    Importe un fichier CSV dans une table SQLite. Si la table est 'usagers', elle applique des règles spécifiques.
+    Importe un fichier Parquet ou CSV dans une table SQLite. Si la table est 'usagers', elle applique des règles spécifiques.
     """
     print(f"[+] Import de {csv_path.name} -> '{table}'")
-    df = pd.read_csv(csv_path, sep=None, engine="python")  # Lecture du fichier CSV
-    df = _harmonize_cols(df)  # Harmonisation des noms de colonnes
+    is_parquet = csv_path.suffix.lower() == ".parquet"
+    if is_parquet and table != "usagers":
+        # Parquet importé tel quel, par lots Arrow
+        import_parquet(conn, csv_path, table)
+    elif table == "usagers":
+        if is_parquet:
+            df = pd.read_parquet(csv_path)  # Lecture du fichier Parquet (colonnes déjà typées)
+        else:
+            df = _read_clean_csv(csv_path)  # Lecture du fichier CSV
+        df = _harmonize_cols(df)  # Harmonisation des noms de colonnes
 
-    if table == "usagers":
         # Si la table est 'usagers', on garde uniquement les colonnes nécessaires et les convertit en numériques
         keep = [x for x in ["num_acc", "catu", "grav", "an_nais"] if x in df.columns]
         df = df[keep].copy()
 
-        df["num_acc"] = pd.to_numeric(df.get("num_acc"), errors="coerce")
-        df["catu"]    = pd.to_numeric(df.get("catu"),    errors="coerce")
-        df["grav"]    = pd.to_numeric(df.get("grav"),    errors="coerce")
-        df["an_nais"] = pd.to_numeric(df.get("an_nais"), errors="coerce")
+        # Conversion numérique en une passe, entiers réduits au plus petit type possible
+        df[keep] = df[keep].apply(pd.to_numeric, errors="coerce", downcast="integer")
 
         df = df.dropna(subset=["num_acc"]).astype({"num_acc": "int64"})  # Supprimer les valeurs NaN et convertir en int
 
@@ -99,22 +318,83 @@ def import_table(conn, csv_path: Path, table: str):
                 an_nais INTEGER
             );
         """)
-        df.to_sql("usagers", conn, if_exists="append", index=False)  # Insérer les données dans la table
+        write_sqlite(df, "usagers", conn, create=False)  # Insérer les données dans la table
     else:
         # Pour les autres tables, on insère les données directement
-        df.to_sql(table, conn, if_exists="replace", index=False)
+        df = _harmonize_cols(_read_clean_csv(csv_path))
+        write_sqlite(df, table, conn)
 
-    # Créer les index pour améliorer les performances de recherche
-    for col in INDEXES.get(table, []):
+# Fonction pour créer tous les index une fois les tables remplies
+def _build_all_indexes(conn):
+    """
+    Crée les index de INDEXES et COMPOSITE_INDEXES après l'import de toutes les tables : chaque index
+    est construit en une passe sur la table finale au lieu d'être maintenu ligne par ligne pendant les insertions.
+    """
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table';")}
+    specs = [(f"idx_{table}_{col}", table, [col]) for table, cols in INDEXES.items() for col in cols]
+    specs += [(name, table, cols) for table, idx in COMPOSITE_INDEXES.items() for name, cols in idx.items()]
+    for name, table, cols in specs:
+        if table not in tables:
+            continue
         try:
-            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{col} ON {table}({col});")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(cols)});")
         except Exception:
-            pass
+            pass  # Colonne absente de ce fichier
+    conn.commit()
+
+# Fonction pour construire les tables de synthèse une fois toutes les tables importées
+def build_summary_tables(conn):
+    """
+    Crée les tables de synthèse (SUMMARY_TABLES) et leur index sur l'année.
+    Ignoré si les tables sources 'usagers'/'caracteristiques' sont absentes.
+    """
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table';")}
+    if not {"usagers", "caracteristiques"} <= tables:
+        return
+    for name, select in SUMMARY_TABLES.items():
+        print(f"[+] Table de synthèse '{name}'")
+        conn.execute(f"DROP TABLE IF EXISTS {name};")
+        conn.execute(f"CREATE TABLE {name} AS {select};")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_an ON {name}(an);")
+    conn.commit()
+
+# Fonction exécutée dans un processus séparé : importe les fichiers d'une table dans une base intermédiaire
+def _import_part(part_path: str, files: list[str], table: str) -> str:
+    """
+    Importe les fichiers de `table` dans la base intermédiaire part_path (une par table : SQLite
+    n'autorise qu'un seul écrivain par fichier). Retourne part_path.
+    """
+    part = Path(part_path)
+    part.unlink(missing_ok=True)
+    conn = connect_sqlite(part)
+    try:
+        for f in files:
+            with _transaction(conn):  # Un fichier = une transaction
+                import_table(conn, Path(f), table)
+    finally:
+        conn.close()
+    return part_path
+
+# Fonction pour recopier une table d'une base intermédiaire dans la base finale, puis supprimer l'intermédiaire
+def _merge_part(conn: sqlite3.Connection, part: Path, table: str) -> None:
+    conn.execute("ATTACH DATABASE ? AS part;", (str(part),))
+    try:
+        row = conn.execute(
+            "SELECT sql FROM part.sqlite_master WHERE type='table' AND name = ?;", (table,)
+        ).fetchone()
+        if row is not None:
+            with _transaction(conn):
+                conn.execute(f'DROP TABLE IF EXISTS main."{table}";')
+                conn.execute(row[0])  # Même schéma (CREATE TABLE) que dans la base intermédiaire
+                conn.execute(f'INSERT INTO main."{table}" SELECT * FROM part."{table}";')
+    finally:
+        conn.execute("DETACH DATABASE part;")
+    part.unlink(missing_ok=True)
 
 # Fonction principale qui gère le processus d'importation des fichiers CSV dans la base SQLite
 def main():
-    p = argparse.ArgumentParser(description="CSV nettoyés -> SQLite (accidents)")
-    p.add_argument("--input", nargs="+", required=True, help="Fichiers/dossiers CSV (ex: data/cleaned)")
+    p = argparse.ArgumentParser(description="Fichiers nettoyés (Parquet/CSV) -> SQLite (accidents)")
+    p.add_argument("--input", nargs="+", required=True, help="Fichiers/dossiers Parquet ou CSV (ex: data/cleaned)")
     p.add_argument("--db", required=True, help="Chemin du .sqlite à créer")
     p.add_argument("--overwrite", action="store_true", help="Écrase la base existante")
     args = p.parse_args()
@@ -123,26 +403,47 @@ def main():
     if db_path.exists() and args.overwrite:
         db_path.unlink()  # Supprimer la base existante si l'option 'overwrite' est activée
 
-    # Liste des fichiers CSV à importer
-    csvs = []
+    # Liste des fichiers Parquet/CSV à importer
+    files = []
     for item in args.input:
         pth = Path(item)
         if pth.is_dir():
-            # Ajouter tous les fichiers CSV d'un dossier
-            csvs += [f for f in pth.iterdir() if f.suffix.lower()==".csv"]
-        elif pth.is_file() and pth.suffix.lower()==".csv":
-            # Ajouter un fichier CSV spécifique
-            csvs.append(pth)
+            # Ajouter tous les fichiers Parquet/CSV d'un dossier
+            files += [f for f in pth.iterdir() if f.suffix.lower() in INPUT_SUFFIXES]
+        elif pth.is_file() and pth.suffix.lower() in INPUT_SUFFIXES:
+            # Ajouter un fichier spécifique
+            files.append(pth)
+    # Un seul fichier par nom : le Parquet l'emporte sur un ancien CSV du même nom
+    by_stem = {}
+    for f in sorted(files, key=lambda f: INPUT_SUFFIXES.index(f.suffix.lower())):
+        by_stem.setdefault(f.with_suffix(""), f)
+    csvs = list(by_stem.values())
     if not csvs:
-        raise FileNotFoundError("Aucun CSV trouvé dans --input")
+        raise FileNotFoundError("Aucun fichier Parquet/CSV trouvé dans --input")
+
+    # Regrouper les fichiers par table (nom deviné à partir du fichier)
+    groups: dict[str, list[str]] = {}
+    for csv in csvs:
+        groups.setdefault(guess_table_name(csv), []).append(str(csv))
+
+    # Importer les tables en parallèle, chacune dans sa base intermédiaire <db>.<table>.part
+    parts: dict[str, Path] = {}
+    with ProcessPoolExecutor(max_workers=min(4, len(groups))) as ex:
+        futures = {
+            ex.submit(_import_part, f"{db_path}.{table}.part", files, table): table
+            for table, files in groups.items()
+        }
+        for fut in as_completed(futures):
+            parts[futures[fut]] = Path(fut.result())  # Propage l'erreur d'import éventuelle
 
     # Connexion à la base de données SQLite
     conn = connect_sqlite(db_path)
     try:
-        # Importer chaque fichier CSV dans la base de données
-        for csv in csvs:
-            table = guess_table_name(csv)  # Deviner le nom de la table à partir du fichier
-            import_table(conn, csv, table)  # Importer les données dans la table correspondante
+        # Recopier chaque table importée dans la base finale
+        for table, part in parts.items():
+            _merge_part(conn, part, table)
+        _build_all_indexes(conn)  # Index créés une seule fois, sur les tables complètes
+        build_summary_tables(conn)  # Pré-agréger les comptes lus par le dashboard
         conn.execute("ANALYZE;")  # Analyser la base de données après importation pour optimiser les performances
         conn.execute("VACUUM;")  # Compresser la base de données pour économiser de l'espace
         print(f"[OK] Base créée : {db_path}")
@@ -0,0 +1,69 @@
+# Chaîne CSV complète : clean_data.py --csv puis to_sqlite.py sur un petit jeu de fichiers bruts
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+UTILS = Path(__file__).resolve().parents[1] / "src" / "utils"
+
+# Fichiers bruts au format data.gouv (séparateur ';', heures "HH:MM", départements "01"/"2A")
+RAW_FILES = {
+    "Caract_2024.csv": (
+        "Num_Acc;jour;mois;an;hrmn;lum;dep;com;agg;int;atm;col;adr;lat;long\n"
+        "202400000001;5;1;2024;08:07;1;01;01053;2;1;1;3;RUE DE LA PAIX;46,2051;5,2256\n"
+        "202400000002;17;6;2024;23:45;5;2A;2A004;1;2;2;6;ROUTE D'AJACCIO;41,9267;8,7369\n"
+    ),
+    "Lieux_2024.csv": (
+        "Num_Acc;catr;voie;v1;v2;circ\n"
+        "202400000001;4;PAIX;0;;2\n"
+        "202400000002;3;193;0;;2\n"
+    ),
+    "Vehicules_2024.csv": (
+        "Num_Acc;id_vehicule;num_veh;senc;catv\n"
+        "202400000001;154 033 002;A01;1;7\n"
+        "202400000002;154 033 003;A01;2;33\n"
+    ),
+    "Usagers_2024.csv": (
+        "Num_Acc;id_usager;id_vehicule;num_veh;place;catu;grav;sexe;an_nais;trajet\n"
+        "202400000001;267 321;154 033 002;A01;1;1;4;1;1980;5\n"
+        "202400000001;267 322;154 033 002;A01;2;2;1;2;2010;0\n"
+        "202400000002;267 323;154 033 003;A01;1;1;2;1;1955;1\n"
+    ),
+}
+
+
+def _run(script: str, *args: str, cwd: Path) -> None:
+    subprocess.run([sys.executable, str(UTILS / script), *args], cwd=str(cwd), check=True)
+
+
+def test_clean_csv_then_to_sqlite(tmp_path):
+    raw = tmp_path / "data" / "raw"
+    raw.mkdir(parents=True)
+    for name, content in RAW_FILES.items():
+        (raw / name).write_text(content, encoding="utf-8")
+
+    _run("clean_data.py", "--csv", cwd=tmp_path)
+    assert sorted(p.suffix for p in (tmp_path / "data" / "cleaned").iterdir()) == [".csv"] * 4
+
+    db = tmp_path / "accidents.sqlite"
+    _run("to_sqlite.py", "--input", "data/cleaned", "--db", str(db), cwd=tmp_path)
+
+    conn = sqlite3.connect(db)
+    try:
+        rows = conn.execute(
+            "SELECT num_acc, dep, hrmn, heure, date FROM caracteristiques ORDER BY num_acc"
+        ).fetchall()
+        assert rows == [
+            (202400000001, "01", "08:07", "08:07", "2024-01-05"),
+            (202400000002, "2A", "23:45", "23:45", "2024-06-17"),
+        ]
+        assert conn.execute("SELECT COUNT(*) FROM lieux").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM vehicules").fetchone()[0] == 2
+        assert conn.execute("SELECT SUM(n) FROM accident_grav_by_year").fetchone()[0] == 3
+    finally:
+        conn.close()